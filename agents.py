@@ -0,0 +1,266 @@
+import copy
+import math
+import random
+import numpy as np
+import pygame as pg
+from . import settings as S
+from . import controls as C
+from . import sprites as SP
+from .level import Level, THEME_NAMES
+
+class Agents:
+    W=38
+    H=54
+    def __init__(self,n,level=None,seed=None,advance=None):
+        self.n=n
+        self.level=level if level is not None else Level(random.Random(seed))
+        self.advance=level is None if advance is None else advance
+        self.reset()
+
+    def reset(self,mask=None):
+        n=self.n
+        if mask is None:
+            mask=np.ones(n,bool)
+            self.x=np.zeros(n,np.int64); self.y=np.zeros(n,np.int64)
+            self.fx=np.zeros(n); self.fy=np.zeros(n)
+            self.vx=np.zeros(n); self.vy=np.zeros(n)
+            self.grav_dir=np.ones(n,np.int64); self.grav_scale=np.ones(n)
+            self.on_surface=np.zeros(n,bool); self.friction=np.full(n,S.GROUND_FRICTION)
+            self.bounce_coef=np.full(n,S.BOUNCE_COEF)
+            self.flip_timer=np.zeros(n); self.extra_flips=np.zeros(n,np.int64)
+            self.shield=np.zeros(n,np.int64)
+            self.slowmo=np.zeros(n,bool); self.slowmo_timer=np.zeros(n)
+            self.doubleflip_timer=np.zeros(n); self.bounce_timer=np.zeros(n)
+            self.dash_cd=np.zeros(n)
+            self.turbo=np.zeros(n,bool); self.turbo_timer=np.zeros(n)
+            self.lives=np.zeros(n,np.int64); self.score=np.zeros(n)
+            self.done=np.zeros(n,bool)
+            self.taken={}
+        m=mask
+        self.x[m]=320; self.y[m]=S.HEIGHT-180
+        self.fx[m]=self.x[m]; self.fy[m]=self.y[m]
+        for a in (self.vx,self.vy,self.on_surface,self.flip_timer,self.extra_flips,self.shield,self.slowmo,self.slowmo_timer,
+                  self.doubleflip_timer,self.bounce_timer,self.dash_cd,self.turbo,self.turbo_timer,self.score,self.done):
+            a[m]=0
+        self.grav_dir[m]=1; self.grav_scale[m]=1.0
+        self.friction[m]=S.GROUND_FRICTION; self.bounce_coef[m]=S.BOUNCE_COEF
+        self.lives[m]=3
+        for k in self.taken.values(): k[m]=False
+
+    def __len__(self):
+        return self.n
+
+    def hit(self,m):
+        self.lives[m]-=1
+        dead=m&(self.lives<=0)
+        self.done|=dead
+        m=m&~dead
+        self.y[m]=S.HEIGHT//2
+        self.vx[m]=0
+        self.vy[m]=0
+
+    def hazard(self,m):
+        if not m.any(): return
+        sh=m&(self.shield>0)
+        self.shield[sh]-=1
+        self.hit(m&~sh)
+
+    def overlap(self,r):
+        return (self.x<r.right)&(r.left<self.x+self.W)&(self.y<r.bottom)&(r.top<self.y+self.H)&self.act
+
+    def bounds(self,margin=0):
+        x=self.x[self.act]; y=self.y[self.act]
+        if not len(x): return None
+        return pg.Rect(int(x.min()),int(y.min()),int(x.max()-x.min())+self.W,int(y.max()-y.min())+self.H).inflate(2*margin,2*margin)
+
+    def step(self,actions=0,dt=S.SIM_DT):
+        a=np.broadcast_to(np.asarray(actions,np.uint8),(self.n,))
+        if self.done.any(): self.reset(self.done&((a&C.RESTART)>0))
+        act=~self.done
+        flip=act&((a&C.FLIP)>0)
+        if flip.any():
+            cd=flip&(self.flip_timer>0)
+            extra=cd&(self.extra_flips>0)
+            self.extra_flips[extra]-=1
+            ok=flip&(~cd|extra)
+            self.grav_dir[ok]*=-1
+            self.vy[ok]*=-0.6
+            self.on_surface[ok]=False
+            self.flip_timer[ok]=0.25
+        left=(a&C.LEFT)>0; right=(a&C.RIGHT)>0
+        dash=act&((a&C.DASH)>0)&(self.dash_cd<=0)
+        if dash.any():
+            d=np.where(left&~right,-1,np.where(right|(self.vx>=0),1,-1))
+            self.vx[dash]+=d[dash]*S.DASH_SPEED
+            self.dash_cd[dash]=S.DASH_COOLDOWN
+        self.update(dt,left,right,act)
+
+    def update(self,dt,left,right,act):
+        self.act=act
+        if self.advance:
+            L=self.level
+            L.update(dt)
+            L.fire_turrets()
+            L.drones.update(dt)
+            L.crates.update(dt)
+            name=THEME_NAMES[int(S.SCROLL_SPEED*L.t*0.1//1000)%len(THEME_NAMES)]
+            if name!=L.theme_name: L.set_theme(name)
+        if not act.any(): return
+        adt=np.where(self.slowmo,dt*S.SLOW_MO_SCALE,dt)
+        acc=S.PLAYER_ACC*np.where(self.turbo,S.TURBO_ACC_SCALE,1.0)
+        vmax=S.PLAYER_MAX_VX*np.where(self.turbo,S.TURBO_SPEED_SCALE,1.0)
+        vx=self.vx+(right.astype(float)-left)*acc*adt
+        self.vx=np.where(act,np.clip(vx,-vmax,vmax),self.vx)
+        self.collide(adt)
+        self.physics(adt)
+        self.score[act]+=S.SCROLL_SPEED*adt[act]*0.1
+        out=act&((self.y>S.HEIGHT+80)|(self.y+self.H<-80))
+        if out.any(): self.hit(out)
+
+    def collide(self,adt):
+        L=self.level
+        W=self.W; H=self.H
+        self.on_surface[:]=False
+        self.friction[:]=S.GROUND_FRICTION
+        self.grav_scale[:]=1.0
+        box=self.bounds(S.COLLIDE_MARGIN)
+        if box is None: return
+        down=self.grav_dir>0
+        for p in L.platforms.near(box):
+            r=p.rect; m=self.overlap(r)
+            if not m.any(): continue
+            c=self.bounce_coef[m] if p.bounce else 0.0
+            vy=np.abs(self.vy[m])*c
+            self.vy[m]=np.where(down[m],-vy,vy)
+            self.y[m]=np.where(down[m],r.top-H,r.bottom)
+            self.on_surface[m]=True
+            self.friction[m]=S.ICE_FRICTION if p.ice else S.GROUND_FRICTION
+            if p.conveyor_vx!=0: self.vx[m]+=p.conveyor_vx*adt[m]
+        for s in L.springs.near(box):
+            m=self.overlap(s.rect)
+            self.vy[m]=-self.grav_dir[m]*np.maximum(380,np.abs(self.vy[m])*S.SPRING_COEF)
+        for fp in L.falls.near(box):
+            r=fp.rect; m=self.overlap(r)
+            self.y[m&down]=r.top-H
+            self.y[m&~down]=r.bottom
+            self.vy[m]=0
+            self.on_surface[m]=True
+        for sl in L.slopes.near(box):
+            m=self.overlap(sl.rect)
+            if not m.any(): continue
+            cam=sl.tab.cam; x1=sl.x1; x2=sl.x2; y1=sl.y1
+            if x2==x1: ys=np.full(self.n,int(y1))
+            else: ys=np.trunc(y1+((self.x+W//2+cam)-x1)/(x2-x1)*(sl.y2-y1)).astype(np.int64)
+            d=m&down&(self.y+H>=ys)&(self.vy>0)
+            u=m&~down&(self.y<=ys)&(self.vy<0)
+            self.y[d]=ys[d]-H; self.y[u]=ys[u]
+            self.vy[d|u]=0
+            self.on_surface[d|u]=True
+        for tab in (L.spikes,L.bombs,L.pendulums,L.saws,L.lasers,L.popspikes,L.bullets,L.drones,L.crushers):
+            gated=tab is L.lasers or tab is L.popspikes
+            for e in tab.scan(box):
+                if gated and not e.active: continue
+                self.hazard(self.overlap(e.rect))
+        self.sample_field()
+        self.vx+=self.wind*adt*self.act
+        self.grav_scale[:]=self.gscale
+        for wl in L.walls.near(box):
+            r=wl.rect; m=self.overlap(r)
+            self.x[m&(self.vx>0)]=r.left-W
+            self.x[m&(self.vx<0)]=r.right
+            self.vx[m]=0
+        for cr in L.crates.near(box):
+            r=cr.rect; m=self.overlap(r)
+            if not m.any(): continue
+            self.x[m&(self.vx>0)]=r.left-W
+            self.x[m&(self.vx<0)]=r.right
+            self.vx[m]*=0.6
+            d=m&down&(self.vy>0)&(self.y+H<=r.centery)
+            u=m&~down&(self.vy<0)&(self.y>=r.centery)
+            self.y[d]=r.top-H; self.y[u]=r.bottom
+            self.vy[d|u]=0
+            self.on_surface[d|u]=True
+        cam=L.wells.cam
+        for wl in L.wells.near(box):
+            dx=math.floor(wl.cx-cam)-(self.x+W//2)
+            dy=math.floor(wl.cy)-(self.y+H//2)
+            dist=np.maximum(1,np.sqrt(dx*dx+dy*dy))
+            m=self.act&(dist<wl.r)
+            if not m.any(): continue
+            d2=dist*dist
+            self.vx[m]+=(wl.sign*S.WELL_STRENGTH*dx/d2*adt)[m]
+            self.vy[m]+=(wl.sign*S.WELL_STRENGTH*dy/d2*adt)[m]
+        self.sample_field()
+        liq=self.liquid*self.act
+        if liq.any():
+            self.grav_scale[liq>0]=S.LIQUID_GRAV_SCALE
+            for k in range(1,int(liq.max())+1):
+                m=liq>=k
+                self.vx[m]-=self.vx[m]*S.LIQUID_DRAG
+        for pu in L.powerups.near(box):
+            m=self.overlap(pu.rect)
+            if not m.any(): continue
+            key=(float(pu.tab.x[pu.i]),float(pu.tab.y[pu.i]))
+            taken=self.taken.get(key)
+            if taken is None: taken=self.taken[key]=np.zeros(self.n,bool)
+            m&=~taken
+            taken|=m
+            self.score[m]+=100
+            kind=pu.kind
+            if kind=='shield': self.shield[m]=1
+            if kind=='slow': self.slowmo[m]=True; self.slowmo_timer[m]=S.SLOW_MO_DURATION
+            if kind=='bounce': self.bounce_timer[m]=6.0; self.bounce_coef[m]=0.9
+            if kind=='dflip': self.doubleflip_timer[m]=S.DOUBLE_FLIP_DURATION; self.extra_flips[m]=1
+            if kind=='turbo': self.turbo[m]=True; self.turbo_timer[m]=S.TURBO_DURATION
+        if len(self.taken)>64:
+            limit=L.scroll_x-300
+            self.taken={k:v for k,v in self.taken.items() if k[0]>=limit}
+
+    def sample_field(self):
+        f=self.level.field
+        f.refresh(self.W,self.H)
+        i=np.searchsorted(f.xs,self.x+self.level.scroll_x)
+        j=np.searchsorted(f.ys,self.y)
+        self.wind=f.wind[i,j]; self.gscale=f.grav[i,j]; self.liquid=f.liquid[i,j]
+
+    def physics(self,adt):
+        act=self.act
+        on=self.on_surface
+        vy=self.vy+S.GRAVITY*self.grav_dir*self.grav_scale*adt
+        vx=np.where(on,self.vx-self.vx*self.friction,self.vx-self.vx*S.AIR_DRAG)
+        vx[on&(np.abs(vx)<8)]=0
+        np.clip(vy,-S.TERMINAL_VY,S.TERMINAL_VY,out=vy)
+        self.vx=np.where(act,vx,self.vx); self.vy=np.where(act,vy,self.vy)
+        sx=self.x!=np.floor(self.fx); self.fx[sx]=self.x[sx]
+        sy=self.y!=np.floor(self.fy); self.fy[sy]=self.y[sy]
+        self.fx+=self.vx*adt*act
+        self.fy+=self.vy*adt*act
+        self.x[:]=np.floor(self.fx)
+        self.y[:]=np.floor(self.fy)
+        for t in (self.flip_timer,self.slowmo_timer,self.doubleflip_timer,self.bounce_timer,self.turbo_timer,self.dash_cd):
+            m=act&(t>0)
+            t[m]-=adt[m]
+        self.slowmo&=~(act&(self.slowmo_timer<=0))
+        self.extra_flips[act&(self.doubleflip_timer<=0)]=0
+        self.turbo&=~(act&(self.turbo_timer<=0))
+
+    def run(self,ticks,policy=None,dt=S.SIM_DT):
+        for _ in range(ticks):
+            self.step(policy(self) if policy else 0,dt)
+            if self.done.all(): break
+        return self
+
+    def snapshot(self,into=None):
+        if into is None or into.n!=self.n:
+            snap=copy.copy(self)
+            snap.x=self.x.copy(); snap.y=self.y.copy(); snap.done=self.done.copy()
+            return snap
+        x,y,done=into.x,into.y,into.done
+        vars(into).update(vars(self))
+        np.copyto(x,self.x); np.copyto(y,self.y); np.copyto(done,self.done)
+        into.x=x; into.y=y; into.done=done
+        return into
+
+    def draw(self,screen):
+        im=SP.cache.get(SP.ghost,self.W,self.H,S.COLOR_PLAYER)
+        return screen.blits([(im,(x-5,y-5)) for x,y in zip(self.x[~self.done].tolist(),self.y[~self.done].tolist())])
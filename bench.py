@@ -0,0 +1,186 @@
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tempfile
+import platform
+import tracemalloc
+from functools import lru_cache
+os.environ.setdefault("SDL_VIDEODRIVER","dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT","1")
+import numpy as np
+import pygame as pg
+from . import settings as S
+from . import controls as C
+from .game import Game
+from .profiler import prof
+from . import course as CS
+
+ACTIONS=(0,0,C.RIGHT,C.RIGHT,C.LEFT,C.FLIP,C.RIGHT|C.DASH,C.LEFT|C.FLIP)
+HIGHER=('ticks_per_s','render_fps','render_fps_dirty')
+LOWER={'peak_kb':64,'gc0':2,'blocks':1000,'gc_frames':2}
+
+def boost(game,theme,keys,k):
+    L=game.level
+    w=L.make_theme_weights(theme)
+    L.overrides={nm:w[nm]*k for nm in keys}
+    game.lock_theme(theme)
+
+def factory(game):
+    boost(game,'Factory',('turret','drone','crusher','laser','saw','conveyor','popspike'),3)
+
+def ocean(game):
+    boost(game,'Ocean',('well','liquid','wind','grav'),4)
+
+def storm(game,tick):
+    if tick%20==0: game.hit()
+    if tick%240==0: game.apply_theme((game.theme_index+1)%len(game.themes))
+
+def lookahead(game):
+    game.level.ahead=S.WIDTH*8
+
+@lru_cache(maxsize=None)
+def scratch():
+    return tempfile.TemporaryDirectory(prefix="gravity-flip-bench-")
+
+@lru_cache(maxsize=None)
+def course_file(seed,seconds=30*60):
+    path=os.path.join(scratch().name,"%d.course"%seed)
+    CS.save(path,CS.generate(seed,S.WIDTH+S.SPAWN_AHEAD+seconds*S.SCROLL_SPEED),seed)
+    return path
+
+def streamed(game):
+    game.play_course(CS.Course(course_file(game.seed)))
+    game.lives=10**9
+
+SCENARIOS={
+    'baseline':dict(ticks=3600),
+    'factory':dict(ticks=3600,setup=factory),
+    'ocean':dict(ticks=3600,setup=ocean),
+    'storm':dict(ticks=3600,hook=storm),
+    'lookahead':dict(ticks=3600,setup=lookahead),
+    'marathon':dict(ticks=30*60*S.FPS),
+    'course':dict(ticks=3600,setup=streamed),
+}
+
+def make(name,seed,screen=None):
+    sc=SCENARIOS[name]
+    game=Game(screen,seed=seed)
+    game.lives=10**9
+    if sc.get('setup'): sc['setup'](game)
+    rnd=random.Random(seed)
+    hook=sc.get('hook')
+    def tick(i):
+        if hook: hook(game,i)
+        game.step(rnd.choice(ACTIONS))
+    return game,tick
+
+def headless(name,seed,ticks):
+    game,tick=make(name,seed)
+    gc.collect()
+    g0=gc.get_stats()[0]['collections']
+    b0=sys.getallocatedblocks()
+    t=time.perf_counter()
+    for i in range(ticks): tick(i)
+    el=time.perf_counter()-t
+    return dict(ticks=ticks,ticks_per_s=ticks/el,gc0=gc.get_stats()[0]['collections']-g0,
+        blocks=sys.getallocatedblocks()-b0,score=round(game.score,3),spawn_x=game.level.spawn_x)
+
+def memory(name,seed,ticks):
+    tracemalloc.start()
+    game,tick=make(name,seed)
+    for i in range(ticks): tick(i)
+    peak=tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak/1024
+
+def render(name,seed,frames,dirty=False,phases=False):
+    screen=pg.Surface((S.WIDTH,S.HEIGHT))
+    game,tick=make(name,seed,screen)
+    game.dirty=dirty
+    if phases:
+        prof.clear()
+        prof.window=frames
+        prof.enable(keep=True)
+    t=time.perf_counter()
+    for i in range(frames):
+        prof.start()
+        tick(i)
+        game.draw()
+        prof.end(game)
+    el=time.perf_counter()-t
+    out=dict(fps=frames/el)
+    if phases:
+        out['phases']={nm:dict(zip(('p50','p95','p99'),np.round(prof.stats(nm),4).tolist())) for nm in prof.hist}
+        out['max_entities']=max(sum(v for k,v in row.items() if k.startswith('n.')) for row in prof.rows)
+        steady=prof.rows[len(prof.rows)//2:]
+        out['gc_frames']=sum(row['gc.gen']>=0 for row in steady)
+        out['alloc_per_frame']=float(np.median([row['alloc'] for row in steady]))
+        prof.disable()
+        prof.window=S.PROFILE_WINDOW
+        prof.clear()
+    return out
+
+def run(name,seed=1,scale=1.0,frames=900,mem_ticks=3600):
+    ticks=max(1,int(SCENARIOS[name]['ticks']*scale))
+    res=headless(name,seed,ticks)
+    r=render(name,seed,frames,phases=True)
+    res['render_fps']=r['fps']
+    res['render_fps_dirty']=render(name,seed,frames,dirty=True)['fps']
+    res['max_entities']=r['max_entities']
+    res['gc_frames']=r['gc_frames']
+    res['alloc_per_frame']=r['alloc_per_frame']
+    res['peak_kb']=memory(name,seed,min(ticks,mem_ticks))
+    res['phases']=r['phases']
+    return res
+
+def compare(results,baseline,tol):
+    out=[]
+    for name,res in results['scenarios'].items():
+        base=baseline['scenarios'].get(name)
+        if base is None: continue
+        if (base['score'],base['spawn_x'],base['ticks'])!=(res['score'],res['spawn_x'],res['ticks']):
+            out.append((name,'workload','changed',base['score'],res['score']))
+        for k in HIGHER:
+            if res[k]<base[k]*(1-tol): out.append((name,k,'slower',base[k],res[k]))
+        for k,slack in LOWER.items():
+            if res[k]>base[k]*(1+tol)+slack: out.append((name,k,'higher',base[k],res[k]))
+    return out
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(prog="gravity-flip-bench")
+    ap.add_argument("names",nargs="*",help="scenarios to run (default: all)")
+    ap.add_argument("--seed",type=int,default=1)
+    ap.add_argument("--scale",type=float,default=1.0,help="multiply every scenario's tick count")
+    ap.add_argument("--frames",type=int,default=900,help="frames per offscreen render pass")
+    ap.add_argument("--out",metavar="JSON")
+    ap.add_argument("--baseline",metavar="JSON",help="flag regressions against a stored result file")
+    ap.add_argument("--tolerance",type=float,default=0.1)
+    args=ap.parse_args(argv)
+    names=args.names or list(SCENARIOS)
+    for nm in names:
+        if nm not in SCENARIOS: ap.error("unknown scenario %r (choose from %s)"%(nm,", ".join(SCENARIOS)))
+    pg.init()
+    results=dict(meta=dict(python=platform.python_version(),pygame=pg.version.ver,numpy=np.__version__,
+        machine=platform.machine(),system=platform.system(),seed=args.seed,scale=args.scale,frames=args.frames),scenarios={})
+    for nm in names:
+        res=results['scenarios'][nm]=run(nm,args.seed,args.scale,args.frames)
+        print("%-10s %9.0f ticks/s %7.1f fps %7.1f fps dirty %9.0f KiB peak %6d gc0 %4d gc frames"%(
+            nm,res['ticks_per_s'],res['render_fps'],res['render_fps_dirty'],res['peak_kb'],res['gc0'],res['gc_frames']),file=sys.stderr)
+    text=json.dumps(results,indent=1)
+    if args.out:
+        with open(args.out,'w') as f: f.write(text)
+    else:
+        print(text)
+    if not args.baseline: return 0
+    with open(args.baseline) as f: baseline=json.load(f)
+    bad=compare(results,baseline,args.tolerance)
+    for nm,k,what,a,b in bad:
+        print("REGRESSION %s %s %s: %s -> %s"%(nm,k,what,a,b),file=sys.stderr)
+    return 1 if bad else 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import pygame as pg
+
+LEFT=1
+RIGHT=2
+FLIP=4
+DASH=8
+RESTART=16
+HELD=LEFT|RIGHT
+EDGES=FLIP|DASH|RESTART
+
+def read(keys,events):
+    a=0
+    if keys[pg.K_a]: a|=LEFT
+    if keys[pg.K_d]: a|=RIGHT
+    for e in events:
+        if e.type==pg.KEYUP:
+            if e.key==pg.K_SPACE: a|=FLIP
+            if e.key==pg.K_r: a|=RESTART
+        if e.type==pg.KEYDOWN:
+            if e.key==pg.K_LSHIFT or e.key==pg.K_RSHIFT: a|=DASH
+    return a
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import random
+import struct
+import hashlib
+import argparse
+from collections import deque
+import numpy as np
+from . import settings as S
+from . import prefabs as P
+from .level import THEME_NAMES
+
+MAGIC=b'GFCS'
+VERSION=1
+HEADER=struct.Struct('<4sHHQQdI')
+FIXED={'x','y','w','h','key','alive'}
+
+def digest(path):
+    h=hashlib.sha1()
+    with open(path,'rb') as f:
+        for block in iter(lambda:f.read(1<<16),b''): h.update(block)
+    return h.digest()
+
+def params(kind):
+    return [('reach',0)]+[(nm,c.default) for nm,c in kind.columns().items() if nm not in FIXED]
+
+def record(slots):
+    return np.dtype([('at','<f8'),('x','<f8'),('y','<f4'),('w','<f4'),('h','<f4'),('kind','u1'),('pat','u1'),('pad','V2'),('p','<f8',(slots,))])
+
+def schema():
+    kinds=[(nm,[c for c,_ in params(kind)]) for nm,kind in P.KINDS.items()]
+    return dict(kinds=kinds,patterns=list(P.PATTERNS))
+
+def generate(seed,length,theme=None,ramp=S.DIFFICULTY_RAMP,overrides=None):
+    gen=P.Generator(random.Random(seed))
+    gen.reset(S.WIDTH)
+    lead=S.WIDTH+S.SPAWN_AHEAD
+    while gen.x<length:
+        t=max(0.0,gen.x-lead)/S.SCROLL_SPEED
+        name=theme or THEME_NAMES[int(S.SCROLL_SPEED*t*0.1//1000)%len(THEME_NAMES)]
+        w=dict(P.THEMES[name])
+        w.update(overrides or {})
+        gen.retheme(P.sampler(w))
+        gen.plan(min(1.0,t/ramp))
+        yield gen.queue.popleft()
+
+def save(path,chunks,seed=0,block=4096):
+    sc=schema()
+    kid={nm:i for i,(nm,_) in enumerate(sc['kinds'])}
+    pid={nm:i+1 for i,nm in enumerate(sc['patterns'])}
+    cols={nm:params(kind) for nm,kind in P.KINDS.items()}
+    slots=max(len(cs) for _,cs in sc['kinds'])
+    dt=record(slots)
+    blob=json.dumps(sc,separators=(',',':')).encode()
+    off=-(-(HEADER.size+len(blob))//8)*8
+    end=float(S.WIDTH)
+    rows=[]
+    with open(path,'wb') as f:
+        f.write(bytes(off))
+        def flush():
+            f.write(np.array(rows,dt).tobytes())
+            rows.clear()
+        for at,pat,batch,end in chunks:
+            first=pid[pat]
+            for name,(x,y,w,h),vals in batch:
+                p=[vals.get(c,d) for c,d in cols[name]]
+                rows.append((at,x,y,w,h,kid[name],first,b'',p+[0.0]*(slots-len(p))))
+                first=0
+            if len(rows)>=block: flush()
+        flush()
+        n=(f.tell()-off)//dt.itemsize
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC,VERSION,slots,seed,n,end,len(blob)))
+        f.write(blob)
+    return n
+
+class Course:
+    def __init__(self,path):
+        with open(path,'rb') as f:
+            magic,version,slots,seed,n,length,size=HEADER.unpack(f.read(HEADER.size))
+            if magic!=MAGIC: raise ValueError(f"{path}: not a course")
+            if version!=VERSION: raise ValueError(f"{path}: unsupported course version {version}")
+            sc=json.loads(f.read(size))
+        self.path=path
+        self.digest=digest(path)
+        self.seed=seed
+        self.length=length
+        self.n=n
+        self.kinds=[(nm,cs) for nm,cs in sc['kinds']]
+        self.patterns=sc['patterns']
+        for nm,cs in self.kinds:
+            kind=P.KINDS.get(nm)
+            if kind is None or not set(cs)<={c for c,_ in params(kind)}: raise ValueError(f"{path}: course entities do not match this build ({nm})")
+        off=-(-(HEADER.size+size)//8)*8
+        self.recs=np.memmap(path,record(slots),'r',off,(n,)) if n else np.zeros(0,record(slots))
+        self.rewind()
+
+    def rewind(self):
+        self.i=0
+        self.cur=None
+        self.queue=deque()
+        return self
+
+    @property
+    def done(self):
+        return self.i>=self.n
+
+    def decode(self,count):
+        rows=self.recs[self.i:self.i+count]
+        self.i+=len(rows)
+        kinds=self.kinds; pats=self.patterns
+        for at,x,y,w,h,k,pat,p in zip(rows['at'].tolist(),rows['x'].tolist(),rows['y'].tolist(),rows['w'].tolist(),rows['h'].tolist(),
+                rows['kind'].tolist(),rows['pat'].tolist(),rows['p'].tolist()):
+            if pat:
+                if self.cur: self.queue.append(self.cur+(at,))
+                self.cur=(at,pats[pat-1],[])
+            name,cs=kinds[k]
+            self.cur[2].append((name,(x,y,w,h),dict(zip(cs,p))))
+        if self.done and self.cur:
+            self.queue.append(self.cur+(self.length,))
+            self.cur=None
+
+    def take(self,difficulty):
+        while not self.queue and not self.done: self.decode(S.COURSE_BLOCK)
+        return self.queue.popleft() if self.queue else None
+
+    def fill(self,limit,difficulty,budget):
+        if not self.done and (not self.queue or self.queue[-1][3]<limit): self.decode(S.COURSE_BLOCK)
+
+    def retheme(self,table):
+        pass
+
+    def __len__(self):
+        return len(self.queue)
+
+def info(path):
+    c=Course(path)
+    pats=c.recs['pat']
+    counts=np.bincount(pats[pats>0],minlength=len(c.patterns)+1)[1:] if c.n else ()
+    return dict(path=path,version=VERSION,seed=c.seed,records=c.n,chunks=int(np.count_nonzero(pats)),length=c.length,
+        seconds=(c.length-S.WIDTH)/S.SCROLL_SPEED,bytes=os.path.getsize(path),record_bytes=c.recs.dtype.itemsize,
+        patterns={nm:int(k) for nm,k in zip(c.patterns,counts) if k})
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(prog="gravity-flip-course")
+    sub=ap.add_subparsers(dest="cmd",required=True)
+    b=sub.add_parser("build",help="generate a course file from a seed")
+    b.add_argument("out")
+    b.add_argument("--seed",type=int,default=0)
+    b.add_argument("--seconds",type=float,default=600.0,help="course length in seconds of scrolling")
+    b.add_argument("--theme",choices=THEME_NAMES,help="lock the pattern weights to one theme (default: cycle by distance)")
+    b.add_argument("--ramp",type=float,default=S.DIFFICULTY_RAMP)
+    i=sub.add_parser("info",help="print a course header and pattern counts")
+    i.add_argument("path")
+    args=ap.parse_args(argv)
+    if args.cmd=="build":
+        length=S.WIDTH+S.SPAWN_AHEAD+args.seconds*S.SCROLL_SPEED
+        n=save(args.out,generate(args.seed,length,args.theme,args.ramp),args.seed)
+        print("%s: %d records, %d bytes"%(args.out,n,os.path.getsize(args.out)))
+    else:
+        print(json.dumps(info(args.path),indent=1))
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
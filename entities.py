@@ -1,13 +1,20 @@
+import copy
 import math
 import random
+from array import array
+import numpy as np
 import pygame as pg
 from . import settings as S
+from . import sprites as SP
+from .store import Row, col
 
 class Player:
     def __init__(self,x,y):
         self.w=38
         self.h=54
         self.rect=pg.Rect(x,y,self.w,self.h)
+        self.x=float(x)
+        self.y=float(y)
         self.vx=0
         self.vy=0
         self.grav_dir=1
@@ -24,17 +31,19 @@ class Player:
         self.doubleflip_timer=0
         self.bounce_timer=0
         self.color=S.COLOR_PLAYER
-        self.trail=[]
+        self.trail=array('i',[0])*(2*S.TRAIL_LENGTH)
+        self.trail_head=0
+        self.trail_n=0
         self.dash_cd=0
         self.turbo_timer=0
         self.turbo=False
 
-    def input(self,dt,keys):
+    def input(self,dt,left,right):
         ax=0
         acc=S.PLAYER_ACC*(S.TURBO_ACC_SCALE if self.turbo else 1.0)
         vmax=S.PLAYER_MAX_VX*(S.TURBO_SPEED_SCALE if self.turbo else 1.0)
-        if keys[pg.K_a]: ax-=acc
-        if keys[pg.K_d]: ax+=acc
+        if left: ax-=acc
+        if right: ax+=acc
         self.vx+=ax*dt
         if abs(self.vx)>vmax:
             self.vx=vmax*(1 if self.vx>0 else -1)
@@ -49,8 +58,11 @@ class Player:
             if abs(self.vx)<8: self.vx=0
         if self.vy> S.TERMINAL_VY: self.vy=S.TERMINAL_VY
         if self.vy< -S.TERMINAL_VY: self.vy=-S.TERMINAL_VY
-        self.rect.x+=int(self.vx*dt)
-        self.rect.y+=int(self.vy*dt)
+        self.sync()
+        self.x+=self.vx*dt
+        self.y+=self.vy*dt
+        self.rect.x=math.floor(self.x)
+        self.rect.y=math.floor(self.y)
         if self.flip_timer>0: self.flip_timer-=dt
         if self.slowmo_timer>0:
             self.slowmo_timer-=dt
@@ -63,12 +75,19 @@ class Player:
         if self.turbo_timer>0:
             self.turbo_timer-=dt
             if self.turbo_timer<=0: self.turbo=False
-        self.trail.append(self.rect.center)
-        if len(self.trail)>S.TRAIL_LENGTH:
-            self.trail.pop(0)
+        k=self.trail_head
+        self.trail[2*k]=self.rect.centerx
+        self.trail[2*k+1]=self.rect.centery
+        self.trail_head=(k+1)%S.TRAIL_LENGTH
+        if self.trail_n<S.TRAIL_LENGTH: self.trail_n+=1
         if self.dash_cd>0:
             self.dash_cd-=dt
 
+    def sync(self):
+        r=self.rect
+        if r.x!=math.floor(self.x): self.x=float(r.x)
+        if r.y!=math.floor(self.y): self.y=float(r.y)
+
     def flip_gravity(self):
         if self.flip_timer>0: 
             if self.extra_flips>0:
@@ -105,341 +124,380 @@ class Player:
         self.turbo=True
         self.turbo_timer=S.TURBO_DURATION
 
+    def snapshot(self,into=None):
+        if into is None:
+            snap=copy.copy(self)
+            snap.rect=self.rect.copy()
+            snap.trail=array('i',self.trail)
+            return snap
+        rect=into.rect; trail=into.trail
+        vars(into).update(vars(self))
+        rect.update(self.rect)
+        trail[:]=self.trail
+        into.rect=rect; into.trail=trail
+        return into
+
     def draw(self,screen):
-        for i,p in enumerate(self.trail):
-            a=int(180*(i/len(self.trail))) if self.trail else 0
-            r=4+int(6*(i/len(self.trail)))
-            s=pg.Surface((r*2,r*2),pg.SRCALPHA)
-            tc=(255,220,120,a) if not self.turbo else (255,140,40,a)
-            pg.draw.circle(s,tc,(r,r),r)
-            screen.blit(s,(p[0]-r,p[1]-r))
-        sh=pg.Surface((self.rect.w+20,self.rect.h//3),pg.SRCALPHA)
-        pg.draw.ellipse(sh,(0,0,0,60),(0,0,sh.get_width(),sh.get_height()))
+        L=S.TRAIL_LENGTH; n=self.trail_n; tr=self.trail
+        discs=SP.cache.get(SP.trail_discs,L,self.turbo)
+        k=(self.trail_head-n)%L
+        out=[]
+        for i in range(L-n,L):
+            d=discs[i]
+            r=d.get_width()//2
+            out.append(screen.blit(d,(tr[2*k]-r,tr[2*k+1]-r)))
+            k=(k+1)%L
+        sh=SP.cache.get(SP.shadow,self.rect.w+20,self.rect.h//3)
         if self.grav_dir>0:
-            screen.blit(sh,(self.rect.centerx-sh.get_width()//2,self.rect.bottom-8))
+            out.append(screen.blit(sh,(self.rect.centerx-sh.get_width()//2,self.rect.bottom-8)))
         else:
-            screen.blit(sh,(self.rect.centerx-sh.get_width()//2,self.rect.top- sh.get_height()+8))
-        pg.draw.rect(screen,(20,20,20),self.rect.inflate(6,6),border_radius=9)
+            out.append(screen.blit(sh,(self.rect.centerx-sh.get_width()//2,self.rect.top- sh.get_height()+8)))
         c=self.color if not self.turbo else S.COLOR_TURBO
-        pg.draw.rect(screen,c,self.rect,border_radius=8)
-        if self.shield_charges>0:
-            pg.draw.rect(screen,(120,220,255),self.rect.inflate(10,10),2,border_radius=10)
-
-class Particle:
-    def __init__(self,x,y,color,life=0.6,vx=0,vy=0,rad=3):
-        self.x=x; self.y=y
-        self.vx=vx; self.vy=vy
-        self.color=color
-        self.life=life
-        self.rad=rad
-    def update(self,dt):
-        self.life-=dt
-        self.x+=self.vx*dt
-        self.y+=self.vy*dt
-        self.vy+=200*dt
-    def draw(self,screen):
-        if self.life<=0: return
-        a=int(255*max(self.life,0))
-        pg.draw.circle(screen,(*self.color[:3],a),(int(self.x),int(self.y)),self.rad)
-
-class Platform:
-    def __init__(self,x,y,w,h,ice=False,bounce=False,move=None,conveyor_vx=0):
-        self.rect=pg.Rect(x,y,w,h)
-        self.ice=ice
-        self.bounce=bounce
-        self.move=move
-        self.base_y=y
-        self.base_x=x
-        self.t=0
-        self.conveyor_vx=conveyor_vx
-    def update(self,dt):
-        if self.move:
-            amp=self.move.get('amp',50)
-            spd=self.move.get('spd',1)
-            axis=self.move.get('axis','y')
-            self.t+=dt*spd
-            off=int(math.sin(self.t)*amp)
-            if axis=='y':
-                self.rect.y=self.base_y+off
-            else:
-                self.rect.x=self.base_x+off
+        r=screen.blit(SP.cache.get(SP.player,self.rect.w,self.rect.h,c,self.shield_charges>0),(self.rect.x-5,self.rect.y-5))
+        return r.unionall(out)
+
+class Platform(Row):
+    __slots__=()
+    ice=col(bool)
+    bounce=col(bool)
+    conveyor_vx=col()
+    moving=col(bool)
+    axis_x=col(bool)
+    amp=col()
+    spd=col()
+    base_x=col()
+    base_y=col()
+    t=col()
+    @staticmethod
+    def add(tab,x,y,w,h,ice=False,bounce=False,move=None,conveyor_vx=0):
+        if move:
+            axis_x=move.get('axis','y')!='y'; amp=move.get('amp',50)
+            return tab.push(x,y,w,h,ice=ice,bounce=bounce,conveyor_vx=conveyor_vx,moving=True,axis_x=axis_x,amp=amp,spd=move.get('spd',1),base_x=x,base_y=y,reach=amp if axis_x else 0)
+        return tab.push(x,y,w,h,ice=ice,bounce=bounce,conveyor_vx=conveyor_vx,base_x=x,base_y=y)
+    @staticmethod
+    def update_all(tab,dt):
+        m=tab.moving
+        if not m.any(): return
+        tab.t+=dt*tab.spd
+        off=np.sin(tab.t)*tab.amp
+        ax=tab.axis_x
+        np.add(tab.base_x,off,out=tab.x,where=ax)
+        np.add(tab.base_y,off,out=tab.y,where=~ax)
     def draw(self,screen):
         c=S.COLOR_ICE if self.ice else S.COLOR_PLATFORM
-        pg.draw.rect(screen,c,self.rect)
-
-class Spike:
-    def __init__(self,x,y,w,h,top=True):
-        self.rect=pg.Rect(x,y,w,h)
-        self.top=top
-    def update(self,dt):
-        pass
+        return pg.draw.rect(screen,c,self.rect)
+
+class Spike(Row):
+    __slots__=()
+    top=col(bool,True)
+    @staticmethod
+    def add(tab,x,y,w,h,top=True):
+        return tab.push(x,y,w,h,top=top)
     def draw(self,screen):
-        c=S.COLOR_SPIKE
-        w=self.rect.w//10
-        for i in range(10):
-            bx=self.rect.x+i*w
-            if self.top:
-                pts=[(bx,self.rect.bottom),(bx+w//2,self.rect.top),(bx+w,self.rect.bottom)]
-            else:
-                pts=[(bx,self.rect.top),(bx+w//2,self.rect.bottom),(bx+w,self.rect.top)]
-            pg.draw.polygon(screen,c,pts)
-
-class Pendulum:
-    def __init__(self,ax,ay,len_pix=160,rad=18,spd=1.0):
-        self.ax=ax
-        self.ay=ay
-        self.len=len_pix
-        self.rad=rad
-        self.t=0
-        self.spd=spd
-        self.pos=(ax,ay+len_pix)
-        self.rect=pg.Rect(0,0,rad*2,rad*2)
-    def update(self,dt):
-        self.t+=dt*self.spd
-        ang=math.sin(self.t)*0.9
-        x=self.ax+math.sin(ang)*self.len
-        y=self.ay+math.cos(ang)*self.len
-        self.pos=(int(x),int(y))
-        self.rect.center=self.pos
+        r=self.rect
+        return screen.blit(SP.cache.get(SP.spike_strip,r.w,r.h,bool(self.top),S.COLOR_SPIKE),r.topleft)
+
+class Pendulum(Row):
+    __slots__=()
+    ax=col()
+    ay=col()
+    length=col()
+    rad=col()
+    spd=col()
+    t=col()
+    @staticmethod
+    def add(tab,ax,ay,len_pix=160,rad=18,spd=1.0):
+        return tab.push(ax-rad,ay+len_pix-rad,rad*2,rad*2,ax=ax,ay=ay,length=len_pix,rad=rad,spd=spd,reach=len_pix)
+    @staticmethod
+    def update_all(tab,dt):
+        tab.t+=dt*tab.spd
+        ang=np.sin(tab.t)*0.9
+        tab.x[:]=tab.ax+np.sin(ang)*tab.length-tab.rad
+        tab.y[:]=tab.ay+np.cos(ang)*tab.length-tab.rad
+    @property
+    def pos(self):
+        r=self.rect
+        return r.center
     def draw(self,screen):
-        pg.draw.line(screen,(200,200,200),(self.ax,self.ay),self.pos,2)
-        pg.draw.circle(screen,S.COLOR_PENDULUM,self.pos,self.rad)
-
-class Bomb:
-    def __init__(self,x,y):
-        self.rect=pg.Rect(x,y,20,20)
-        self.vy=120
-    def update(self,dt):
-        self.rect.y+=int(self.vy*dt)
+        r=pg.draw.line(screen,(200,200,200),(math.floor(self.ax-self.tab.cam),int(self.ay)),self.pos,2)
+        return r.union(pg.draw.circle(screen,S.COLOR_PENDULUM,self.pos,int(self.rad)))
+
+class Bomb(Row):
+    __slots__=()
+    vy=col(default=120)
+    @staticmethod
+    def add(tab,x,y):
+        return tab.push(x,y,20,20)
+    @staticmethod
+    def update_all(tab,dt):
+        tab.y+=tab.vy*dt
     def draw(self,screen):
-        pg.draw.circle(screen,S.COLOR_BOMB,self.rect.center,10)
-
-class PowerUp:
-    def __init__(self,x,y,kind):
-        self.rect=pg.Rect(x,y,24,24)
-        self.kind=kind
-        self.alive=True
-    def update(self,dt):
-        pass
+        return pg.draw.circle(screen,S.COLOR_BOMB,self.rect.center,10)
+
+class PowerUp(Row):
+    __slots__=()
+    KINDS=('shield','slow','bounce','dflip','turbo')
+    code=col(np.int8)
+    @staticmethod
+    def add(tab,x,y,kind):
+        return tab.push(x,y,24,24,code=PowerUp.KINDS.index(kind))
+    @property
+    def kind(self):
+        return PowerUp.KINDS[self.code]
     def draw(self,screen):
-        pg.draw.rect(screen,S.COLOR_POWERUP,self.rect,border_radius=6)
-        f=pg.font.SysFont(S.FONT_NAME,16)
+        r=self.rect
         txt={'shield':'S','slow':'T','bounce':'B','dflip':'D','turbo':'T+'}[self.kind]
-        im=f.render(txt,True,(30,40,40))
-        r=im.get_rect(center=self.rect.center)
-        screen.blit(im,r)
-
-class Saw:
-    def __init__(self,x,y,rad=18,spd=180,amp=60):
-        self.rad=rad
-        self.center=[x,y]
-        self.rect=pg.Rect(0,0,rad*2,rad*2)
-        self.rect.center=self.center
-        self.spd=spd
-        self.amp=amp
-        self.t=0
-    def update(self,dt):
-        self.t+=dt
-        self.center[0]+=int(math.cos(self.t)*self.spd*dt)
-        self.center[1]+=int(math.sin(self.t*1.6)*0)
-        self.rect.center=self.center
+        return screen.blit(SP.cache.get(SP.powerup,r.w,r.h,txt),r.topleft)
+
+class Saw(Row):
+    __slots__=()
+    DRIFT=True
+    rad=col()
+    cx=col()
+    cy=col()
+    spd=col()
+    amp=col()
+    t=col()
+    @staticmethod
+    def add(tab,x,y,rad=18,spd=180,amp=60):
+        return tab.push(x-rad,y-rad,rad*2,rad*2,rad=rad,cx=x,cy=y,spd=spd,amp=amp)
+    @staticmethod
+    def update_all(tab,dt):
+        tab.t+=dt
+        tab.cx+=np.cos(tab.t)*tab.spd*dt
+        tab.x[:]=tab.cx-tab.rad
+        tab.y[:]=tab.cy-tab.rad
     def draw(self,screen):
-        pg.draw.circle(screen,(230,230,230),self.rect.center,self.rad)
-        for i in range(8):
-            ang=i*math.pi/4
-            x=self.rect.centerx+int(math.cos(ang)*self.rad)
-            y=self.rect.centery+int(math.sin(ang)*self.rad)
-            pg.draw.line(screen,(180,180,180),self.rect.center,(x,y),2)
-
-class LaserGate:
-    def __init__(self,x,y,h=180,period=2.2):
-        self.rect=pg.Rect(x,y,12,h)
-        self.period=period
-        self.t=0
-        self.active=True
-    def update(self,dt):
-        self.t+=dt
-        self.active=(self.t%self.period)<(self.period*0.6)
+        r=self.rect
+        rad=int(self.rad)
+        frame=int(self.t*S.SAW_SPIN*S.SAW_FRAMES/(math.pi/4))%S.SAW_FRAMES
+        return screen.blit(SP.cache.get(SP.saw,rad,frame),(r.centerx-rad,r.centery-rad))
+
+class LaserGate(Row):
+    __slots__=()
+    period=col()
+    t=col()
+    active=col(bool,True)
+    @staticmethod
+    def add(tab,x,y,h=180,period=2.2):
+        return tab.push(x,y,12,h,period=period)
+    @staticmethod
+    def update_all(tab,dt):
+        tab.t+=dt
+        tab.active[:]=(tab.t%tab.period)<(tab.period*0.6)
     def draw(self,screen):
         c=(255,60,60) if self.active else (120,40,40)
-        pg.draw.rect(screen,c,self.rect)
-
-class Slope:
-    def __init__(self,x1,y1,x2,y2,thickness=16):
-        self.x1,self.y1,self.x2,self.y2=x1,y1,x2,y2
+        return pg.draw.rect(screen,c,self.rect)
+
+class Slope(Row):
+    __slots__=()
+    x1=col()
+    y1=col()
+    x2=col()
+    y2=col()
+    thickness=col()
+    @staticmethod
+    def add(tab,x1,y1,x2,y2,thickness=16):
         minx=min(x1,x2); maxx=max(x1,x2)
         miny=min(y1,y2); maxy=max(y1,y2)
-        self.rect=pg.Rect(minx,miny,maxx-minx,maxy-miny+thickness)
-        self.thickness=thickness
+        return tab.push(minx,miny,maxx-minx,maxy-miny+thickness,x1=x1,y1=y1,x2=x2,y2=y2,thickness=thickness)
     def y_at(self,x):
-        if self.x2==self.x1: return self.y1
-        t=(x-self.x1)/(self.x2-self.x1)
-        return int(self.y1+t*(self.y2-self.y1))
-    def update(self,dt):
-        pass
+        x+=self.tab.cam
+        x1=self.x1; x2=self.x2; y1=self.y1
+        if x2==x1: return int(y1)
+        t=(x-x1)/(x2-x1)
+        return int(y1+t*(self.y2-y1))
     def draw(self,screen):
-        pg.draw.line(screen,S.COLOR_SLOPE,(self.x1,self.y1),(self.x2,self.y2),self.thickness)
-
-class WindZone:
-    def __init__(self,x,y,w,h,wind_vx=180):
-        self.rect=pg.Rect(x,y,w,h)
-        self.wind_vx=wind_vx
-    def update(self,dt):
-        pass
+        cam=self.tab.cam
+        return pg.draw.line(screen,S.COLOR_SLOPE,(math.floor(self.x1-cam),int(self.y1)),(math.floor(self.x2-cam),int(self.y2)),int(self.thickness))
+
+class WindZone(Row):
+    __slots__=()
+    wind_vx=col()
+    @staticmethod
+    def add(tab,x,y,w,h,wind_vx=180):
+        return tab.push(x,y,w,h,wind_vx=wind_vx)
     def draw(self,screen):
-        pg.draw.rect(screen,S.COLOR_WIND,self.rect,2)
-
-class GravityZone:
-    def __init__(self,x,y,w,h,scale=0.6):
-        self.rect=pg.Rect(x,y,w,h)
-        self.scale=scale
-    def update(self,dt):
-        pass
+        return pg.draw.rect(screen,S.COLOR_WIND,self.rect,2)
+
+class GravityZone(Row):
+    __slots__=()
+    scale=col()
+    @staticmethod
+    def add(tab,x,y,w,h,scale=0.6):
+        return tab.push(x,y,w,h,scale=scale)
     def draw(self,screen):
-        pg.draw.rect(screen,S.COLOR_GRAV_ZONE,self.rect,2)
+        return pg.draw.rect(screen,S.COLOR_GRAV_ZONE,self.rect,2)
 
-class Wall:
-    def __init__(self,x,y,h,width=16):
-        self.rect=pg.Rect(x,y,width,h)
-    def update(self,dt):
-        pass
+class Wall(Row):
+    __slots__=()
+    @staticmethod
+    def add(tab,x,y,h,width=16):
+        return tab.push(x,y,width,h)
     def draw(self,screen):
-        pg.draw.rect(screen,(160,160,200),self.rect)
-
-class Crate:
-    def __init__(self,x,y,w=40,h=40):
-        self.rect=pg.Rect(x,y,w,h)
-        self.vx=0
-        self.vy=0
-        self.on_surface=False
-    def update(self,dt):
-        self.vy+=S.GRAVITY*dt
-        if self.on_surface:
-            self.vx-=self.vx*S.GROUND_FRICTION
-        self.rect.x+=int(self.vx*dt)
-        self.rect.y+=int(self.vy*dt)
-        self.on_surface=False
+        return pg.draw.rect(screen,(160,160,200),self.rect)
+
+class Crate(Row):
+    __slots__=()
+    DRIFT=True
+    vx=col()
+    vy=col()
+    on_surface=col(bool)
+    @staticmethod
+    def add(tab,x,y,w=40,h=40):
+        return tab.push(x,y,w,h)
+    @staticmethod
+    def update_all(tab,dt):
+        tab.vy+=S.GRAVITY*dt
+        s=tab.on_surface
+        tab.vx-=tab.vx*(S.GROUND_FRICTION*s)
+        tab.x+=tab.vx*dt
+        tab.y+=tab.vy*dt
+        s[:]=False
     def draw(self,screen):
-        pg.draw.rect(screen,S.COLOR_CRATE,self.rect)
+        return pg.draw.rect(screen,S.COLOR_CRATE,self.rect)
 
-class Springboard:
-    def __init__(self,x,y,w=80,h=18):
-        self.rect=pg.Rect(x,y,w,h)
-    def update(self,dt):
-        pass
+class Springboard(Row):
+    __slots__=()
+    @staticmethod
+    def add(tab,x,y,w=80,h=18):
+        return tab.push(x,y,w,h)
     def draw(self,screen):
-        pg.draw.rect(screen,S.COLOR_SPRING,self.rect)
-
-class GravityWell:
-    def __init__(self,x,y,r=120,sign=1):
-        self.x=x; self.y=y; self.r=r; self.sign=sign
-        self.rect=pg.Rect(x-r,y-r,r*2,r*2)
-    def update(self,dt):
-        pass
+        return pg.draw.rect(screen,S.COLOR_SPRING,self.rect)
+
+class GravityWell(Row):
+    __slots__=()
+    cx=col()
+    cy=col()
+    r=col()
+    sign=col()
+    @staticmethod
+    def add(tab,x,y,r=120,sign=1):
+        return tab.push(x-r,y-r,r*2,r*2,cx=x,cy=y,r=r,sign=sign)
+    @property
+    def x(self):
+        return math.floor(self.cx-self.tab.cam)
+    @property
+    def y(self):
+        return int(self.cy)
     def draw(self,screen):
-        pg.draw.circle(screen,S.COLOR_WELL,(self.x,self.y),self.r,2)
-        pg.draw.circle(screen,S.COLOR_WELL,(self.x,self.y),int(self.r*0.6),1)
-        pg.draw.circle(screen,S.COLOR_WELL,(self.x,self.y),int(self.r*0.3),1)
-
-class LiquidZone:
-    def __init__(self,x,y,w,h):
-        self.rect=pg.Rect(x,y,w,h)
-    def update(self,dt):
-        pass
+        r=int(self.r)
+        return screen.blit(SP.cache.get(SP.well,r,S.COLOR_WELL),(self.x-r,self.y-r))
+
+class LiquidZone(Row):
+    __slots__=()
+    @staticmethod
+    def add(tab,x,y,w,h):
+        return tab.push(x,y,w,h)
     def draw(self,screen):
-        pg.draw.rect(screen,S.COLOR_WATER,self.rect)
-
-class Bullet:
-    def __init__(self,x,y,vx,vy=0):
-        self.rect=pg.Rect(x,y,10,10)
-        self.vx=vx
-        self.vy=vy
-        self.alive=True
-    def update(self,dt):
-        self.rect.x+=int(self.vx*dt)
-        self.rect.y+=int(self.vy*dt)
+        return pg.draw.rect(screen,S.COLOR_WATER,self.rect)
+
+class Bullet(Row):
+    __slots__=()
+    DRIFT=True
+    vx=col()
+    vy=col()
+    @staticmethod
+    def add(tab,x,y,vx,vy=0):
+        return tab.push(x,y,10,10,vx=vx,vy=vy)
+    @staticmethod
+    def update_all(tab,dt):
+        tab.x+=tab.vx*dt
+        tab.y+=tab.vy*dt
     def draw(self,screen):
-        pg.draw.rect(screen,(255,80,80),self.rect)
-
-class Turret:
-    def __init__(self,x,y,period=1.2,speed=420):
-        self.rect=pg.Rect(x,y,28,28)
-        self.t=0
-        self.period=period
-        self.speed=speed
-    def update(self,dt):
-        self.t+=dt
-    def can_fire(self):
-        return self.t>=self.period
-    def fire(self):
-        self.t=0
-        return Bullet(self.rect.centerx,self.rect.centery,-self.speed,0)
+        return pg.draw.rect(screen,(255,80,80),self.rect)
+
+class Turret(Row):
+    __slots__=()
+    t=col()
+    period=col()
+    speed=col()
+    @staticmethod
+    def add(tab,x,y,period=1.2,speed=420):
+        return tab.push(x,y,28,28,period=period,speed=speed)
+    @staticmethod
+    def update_all(tab,dt):
+        tab.t+=dt
+    @staticmethod
+    def fire_all(tab,bullets):
+        for i in np.flatnonzero(tab.t>=tab.period).tolist():
+            tab.t[i]=0
+            bullets.add(int(tab.x[i])+int(tab.w[i])//2,int(tab.y[i])+int(tab.h[i])//2,-tab.speed[i],0)
     def draw(self,screen):
-        pg.draw.rect(screen,(220,120,120),self.rect)
-
-class Drone:
-    def __init__(self,x,y):
-        self.rect=pg.Rect(x,y,24,24)
-        self.vx=-120
-        self.vy=0
-        self.acc=220
-    def update(self,dt,player=None):
+        return pg.draw.rect(screen,(220,120,120),self.rect)
+
+class Drone(Row):
+    __slots__=()
+    DRIFT=True
+    vx=col(default=-120)
+    vy=col()
+    acc=col(default=220)
+    @staticmethod
+    def add(tab,x,y):
+        return tab.push(x,y,24,24)
+    @staticmethod
+    def update_all(tab,dt,player=None):
         if player:
-            dy=player.rect.centery-self.rect.centery
-            self.vy+=max(-self.acc,min(self.acc,dy*0.6))*dt
-            self.vy=max(-200,min(200,self.vy))
-        self.rect.x+=int(self.vx*dt)
-        self.rect.y+=int(self.vy*dt)
+            dy=player.rect.centery-(tab.y+tab.h//2)
+            tab.vy+=np.clip(dy*0.6,-tab.acc,tab.acc)*dt
+            np.clip(tab.vy,-200,200,out=tab.vy)
+        tab.x+=tab.vx*dt
+        tab.y+=tab.vy*dt
     def draw(self,screen):
-        pg.draw.rect(screen,(255,180,90),self.rect,border_radius=6)
-
-class Crusher:
-    def __init__(self,x,top=True,range_h=260,spd=520,width=36):
-        self.top=top
+        r=self.rect
+        return screen.blit(SP.cache.get(SP.rounded,r.w,r.h,(255,180,90),6),r.topleft)
+
+class Crusher(Row):
+    __slots__=()
+    top=col(bool,True)
+    spd=col()
+    dir=col(default=1)
+    @staticmethod
+    def add(tab,x,top=True,range_h=260,spd=520,width=36):
         y=0 if top else S.HEIGHT-range_h
-        self.rect=pg.Rect(x,y,width,range_h)
-        self.spd=spd
-        self.dir=1
-    def update(self,dt):
-        dy=int(self.spd*self.dir*dt)
-        self.rect.y+= dy if self.top else -dy
-        if self.top and (self.rect.y<0 or self.rect.bottom> S.HEIGHT//2): self.dir*=-1
-        if not self.top and (self.rect.bottom> S.HEIGHT or self.rect.top< S.HEIGHT//2): self.dir*=-1
+        return tab.push(x,y,width,range_h,top=top,spd=spd)
+    @staticmethod
+    def update_all(tab,dt):
+        dy=tab.spd*tab.dir*dt
+        top=tab.top
+        tab.y+=np.where(top,dy,-dy)
+        b=tab.y+tab.h
+        flip=(top&((tab.y<0)|(b>S.HEIGHT//2)))|(~top&((b>S.HEIGHT)|(tab.y<S.HEIGHT//2)))
+        tab.dir[flip]*=-1
     def draw(self,screen):
-        pg.draw.rect(screen,(200,100,200),self.rect)
-
-class PopSpike:
-    def __init__(self,x,y,w=120,h=26,period=1.3,up=True):
-        self.rect=pg.Rect(x,y,w,h)
-        self.period=period
-        self.t=0
-        self.active=False
-        self.up=up
-    def update(self,dt):
-        self.t+=dt
-        self.active=(self.t%self.period)>(self.period*0.4)
+        return pg.draw.rect(screen,(200,100,200),self.rect)
+
+class PopSpike(Row):
+    __slots__=()
+    period=col()
+    t=col()
+    active=col(bool)
+    up=col(bool,True)
+    @staticmethod
+    def add(tab,x,y,w=120,h=26,period=1.3,up=True):
+        return tab.push(x,y,w,h,period=period,up=up)
+    @staticmethod
+    def update_all(tab,dt):
+        tab.t+=dt
+        tab.active[:]=(tab.t%tab.period)>(tab.period*0.4)
     def draw(self,screen):
-        c=S.COLOR_SPIKE
+        r=self.rect
         if not self.active:
-            pg.draw.rect(screen,(120,60,60),self.rect)
-            return
-        w=self.rect.w//10
-        for i in range(10):
-            bx=self.rect.x+i*w
-            if self.up:
-                pts=[(bx,self.rect.bottom),(bx+w//2,self.rect.top),(bx+w,self.rect.bottom)]
-            else:
-                pts=[(bx,self.rect.top),(bx+w//2,self.rect.bottom),(bx+w,self.rect.top)]
-            pg.draw.polygon(screen,c,pts)
-
-class FallingPlatform:
-    def __init__(self,x,y,w,h):
-        self.rect=pg.Rect(x,y,w,h)
-        self.triggered=False
-        self.vy=0
-    def update(self,dt):
-        if self.triggered:
-            self.vy+=S.GRAVITY*dt
-            self.rect.y+=int(self.vy*dt)
+            return screen.fill((120,60,60),r)
+        return screen.blit(SP.cache.get(SP.spike_strip,r.w,r.h,bool(self.up),S.COLOR_SPIKE),r.topleft)
+
+class FallingPlatform(Row):
+    __slots__=()
+    triggered=col(bool)
+    vy=col()
+    @staticmethod
+    def add(tab,x,y,w,h):
+        return tab.push(x,y,w,h)
+    @staticmethod
+    def update_all(tab,dt):
+        m=tab.triggered
+        if not m.any(): return
+        tab.vy[m]+=S.GRAVITY*dt
+        tab.y[m]+=tab.vy[m]*dt
     def draw(self,screen):
-        pg.draw.rect(screen,(200,200,120),self.rect)
+        return pg.draw.rect(screen,(200,200,120),self.rect)
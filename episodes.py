@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT","1")
+import numpy as np
+from . import settings as S
+from . import controls as C
+from . import prefabs as P
+from .game import Game
+
+ACTIONS=(0,0,C.RIGHT,C.RIGHT,C.LEFT,C.FLIP,C.RIGHT|C.DASH,C.LEFT|C.FLIP)
+
+def idle(rng):
+    return lambda game:0
+
+def chaos(rng):
+    return lambda game:rng.choice(ACTIONS)
+
+def runner(rng):
+    def act(game):
+        p=game.player
+        r=p.rect
+        a=C.RIGHT if r.centerx<S.WIDTH//3 else (C.LEFT if r.centerx>S.WIDTH//2 else 0)
+        probe=r.move(0,60*p.grav_dir)
+        if not p.on_surface and not game.level.platforms.near(probe) and rng.random()<0.2: a|=C.FLIP
+        return a
+    return act
+
+POLICIES={'idle':idle,'random':chaos,'runner':runner}
+
+def episode(spec):
+    seed=spec['seed']
+    game=Game(seed=seed)
+    if spec.get('theme','cycle')!='cycle': game.lock_theme(spec['theme'])
+    L=game.level
+    L.set_ramp(spec.get('ramp',S.DIFFICULTY_RAMP))
+    if spec.get('weights'):
+        L.overrides=spec['weights']
+        L.set_theme(L.theme_name)
+    policy=POLICIES[spec['policy']](random.Random(seed))
+    ticks=0
+    limit=spec.get('max_ticks',S.FPS*600)
+    while ticks<limit and not game.game_over:
+        game.step(policy(game))
+        ticks+=1
+    hits=Counter(c for c,absorbed in game.hit_log if not absorbed)
+    shielded=Counter(c for c,absorbed in game.hit_log if absorbed)
+    return dict(spec,ticks=ticks,survival=ticks*S.SIM_DT,score=round(game.score,2),over=game.game_over,
+        hits=dict(hits),shielded=dict(shielded),patterns=dict(L.patterns))
+
+def specs(n,policies,themes,seed=0,**kw):
+    for k,pol,th in itertools.product(range(n),policies,themes):
+        yield dict(kw,seed=seed+k,policy=pol,theme=th)
+
+def run(jobs,tasks,chunk=8):
+    if jobs==1:
+        yield from map(episode,tasks)
+        return
+    with Pool(jobs) as pool:
+        yield from pool.imap_unordered(episode,tasks,chunk)
+
+class Summary:
+    def __init__(self):
+        self.groups=defaultdict(lambda:dict(n=0,survival=[],score=[],over=0,hits=Counter(),shielded=Counter(),patterns=Counter()))
+
+    def add(self,res):
+        g=self.groups[(res['policy'],res['theme'])]
+        g['n']+=1
+        g['survival'].append(res['survival'])
+        g['score'].append(res['score'])
+        g['over']+=res['over']
+        g['hits'].update(res['hits'])
+        g['shielded'].update(res['shielded'])
+        g['patterns'].update(res['patterns'])
+
+    def table(self):
+        out=[]
+        for (pol,th),g in sorted(self.groups.items()):
+            sv=np.array(g['survival']); sc=np.array(g['score'])
+            n=g['n']
+            hits=sum(g['hits'].values())
+            pats=sum(g['patterns'].values()) or 1
+            out.append(dict(policy=pol,theme=th,episodes=n,game_over=g['over']/n,
+                survival_mean=float(sv.mean()),survival_p50=float(np.median(sv)),survival_p90=float(np.percentile(sv,90)),
+                score_mean=float(sc.mean()),hits_per_episode=hits/n,
+                hit_causes={c:k/hits for c,k in g['hits'].most_common()},
+                shielded_per_episode=sum(g['shielded'].values())/n,
+                pattern_share={p:k/pats for p,k in g['patterns'].most_common()}))
+        return out
+
+    def text(self):
+        lines=["%-8s %-8s %7s %6s %8s %8s %8s %9s  %s"%("policy","theme","runs","over","surv","p50","p90","score","top hit causes")]
+        for row in self.table():
+            causes=" ".join("%s:%.0f%%"%(c,100*v) for c,v in list(row['hit_causes'].items())[:4])
+            lines.append("%-8s %-8s %7d %5.0f%% %7.1fs %7.1fs %7.1fs %9.1f  %s"%(row['policy'],row['theme'],row['episodes'],100*row['game_over'],
+                row['survival_mean'],row['survival_p50'],row['survival_p90'],row['score_mean'],causes))
+        return "\n".join(lines)
+
+def weight(s):
+    k,_,v=s.partition('=')
+    if k not in P.PATTERNS: raise argparse.ArgumentTypeError("unknown pattern %r (choose from %s)"%(k,", ".join(P.PATTERNS)))
+    return k,float(v)
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(prog="gravity-flip-episodes")
+    ap.add_argument("-n","--episodes",type=int,default=100,help="seeds per policy/theme combination")
+    ap.add_argument("-j","--jobs",type=int,default=os.cpu_count() or 1)
+    ap.add_argument("--policy",nargs="+",default=['random'],choices=sorted(POLICIES))
+    ap.add_argument("--theme",nargs="+",default=['cycle'],choices=['cycle','Desert','Factory','Ocean'])
+    ap.add_argument("--seed",type=int,default=0)
+    ap.add_argument("--ramp",type=float,default=S.DIFFICULTY_RAMP,help="seconds until full difficulty")
+    ap.add_argument("--weight",type=weight,action="append",default=[],metavar="PATTERN=W",help="override a pattern weight in every theme")
+    ap.add_argument("--max-ticks",type=int,default=S.FPS*600)
+    ap.add_argument("--out",metavar="JSONL",help="stream one result per episode")
+    ap.add_argument("--summary",metavar="JSON",help="write the aggregated tables")
+    args=ap.parse_args(argv)
+    tasks=specs(args.episodes,args.policy,args.theme,args.seed,ramp=args.ramp,weights=dict(args.weight),max_ticks=args.max_ticks)
+    total=args.episodes*len(args.policy)*len(args.theme)
+    summary=Summary()
+    out=open(args.out,'w') if args.out else None
+    t=time.perf_counter()
+    for k,res in enumerate(run(args.jobs,tasks),1):
+        summary.add(res)
+        if out: out.write(json.dumps(res)+"\n")
+        if k%max(1,total//20)==0 or k==total:
+            el=time.perf_counter()-t
+            print("%d/%d episodes  %.1f/s"%(k,total,k/el),file=sys.stderr)
+    if out: out.close()
+    print(summary.text())
+    if args.summary:
+        with open(args.summary,'w') as f: json.dump(summary.table(),f,indent=1)
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import math
+from bisect import bisect_left
+import numpy as np
+from . import settings as S
+
+class ForceField:
+    def __init__(self,level):
+        self.level=level
+        self.key=None
+        self.xs=[]
+        self.ys=[]
+        self.wind=np.zeros((1,1))
+        self.grav=np.ones((1,1))
+        self.liquid=np.zeros((1,1),np.int32)
+        self.cells=[[(0.0,1.0,0,())]]
+
+    def refresh(self,w,h):
+        L=self.level
+        tabs=(L.winds,L.gravzones,L.liquids,L.wells)
+        key=(w,h,L.winds.head,L.winds.tail,L.gravzones.head,L.gravzones.tail,L.liquids.head,L.liquids.tail,L.wells.head,L.wells.tail)
+        if key==self.key: return
+        self.key=key
+        boxes=[]
+        for kind,(tab,vals) in enumerate(zip(tabs,(L.winds.wind_vx,L.gravzones.scale,L.liquids.alive))):
+            for i in tab.alive.nonzero()[0].tolist():
+                x=tab.x[i]; y=math.floor(tab.y[i])
+                v=vals[i]
+                boxes.append((x-w,x+int(tab.w[i])-1,y-h,y+int(tab.h[i])-1,kind,v))
+        wl=L.wells
+        for i in wl.alive.nonzero()[0].tolist():
+            cx=wl.cx[i]; cy=wl.cy[i]; r=wl.r[i]
+            x=cx-w//2; y=math.floor(cy)-h//2
+            boxes.append((x-r-1,x+r+1,y-r-1,y+r+1,3,(cx,cy,r,wl.sign[i])))
+        xs=self.xs=sorted({b[0] for b in boxes}|{b[1] for b in boxes})
+        ys=self.ys=sorted({b[2] for b in boxes}|{b[3] for b in boxes})
+        shape=(len(xs)+1,len(ys)+1)
+        wind=np.zeros(shape); grav=np.ones(shape); liquid=np.zeros(shape,np.int32)
+        wells=[[() for _ in range(shape[1])] for _ in range(shape[0])]
+        for x0,x1,y0,y1,kind,v in boxes:
+            i0=bisect_left(xs,x0)+1; i1=bisect_left(xs,x1)+1
+            j0=bisect_left(ys,y0)+1; j1=bisect_left(ys,y1)+1
+            if kind==0: wind[i0:i1,j0:j1]+=v
+            elif kind==1: grav[i0:i1,j0:j1]=v
+            elif kind==2: liquid[i0:i1,j0:j1]+=1
+            else:
+                for i in range(i0,i1):
+                    row=wells[i]
+                    for j in range(j0,j1): row[j]+=(v,)
+        self.wind=wind; self.grav=grav; self.liquid=liquid
+        self.cells=[list(zip(*c)) for c in zip(wind.tolist(),grav.tolist(),liquid.tolist(),wells)]
+
+    def sample(self,rect):
+        self.refresh(rect.w,rect.h)
+        return self.cells[bisect_left(self.xs,rect.x+self.level.scroll_x)][bisect_left(self.ys,rect.y)]
+
+    def pull(self,rect):
+        cam=self.level.wells.cam
+        px=rect.centerx; py=rect.centery
+        for cx,cy,r,sign in self.sample(rect)[3]:
+            dx=math.floor(cx-cam)-px
+            dy=math.floor(cy)-py
+            dist=max(1,(dx*dx+dy*dy)**0.5)
+            if dist<r:
+                yield sign*S.WELL_STRENGTH*dx/(dist*dist),sign*S.WELL_STRENGTH*dy/(dist*dist)
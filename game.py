@@ -1,29 +1,66 @@
+import gc
+import copy
 import random
 import math
+import numpy as np
 import pygame as pg
 from . import settings as S
-from .entities import Player, Platform, Spike, Pendulum, Bomb, PowerUp, Saw, LaserGate, Particle
+from . import controls as C
+from . import text as T
+from . import sprites as SP
+from .profiler import prof
+from .entities import Player, Platform, Spike, Pendulum, Bomb, PowerUp, Saw, LaserGate
 from .level import Level
+from .particles import Particles
+from .agents import Agents
+
+class Canvas:
+    def __init__(self):
+        self.drawn=[]
+        self.backdrop=None
+        self.bg=None
+        self.key=None
+        self.band=None
+        self.hud=[(None,None),(None,None)]
 
 class Game:
-    def __init__(self,screen):
+    def __init__(self,screen=None,seed=None):
         self.screen=screen
+        self.headless=screen is None
+        self.seed=seed if seed is not None else random.randrange(1<<32)
+        self.rng=random.Random(self.seed)
+        self.fx_rng=random.Random(self.seed)
+        self.particles=Particles(S.PARTICLE_LIMIT,np.random.default_rng(self.seed))
         self.clock=pg.time.Clock()
-        self.font=pg.font.SysFont(S.FONT_NAME,22)
-        self.bigfont=pg.font.SysFont(S.FONT_NAME,48)
+        self.dirty=False
+        self.canvas=Canvas()
+        self.ghosts=None
+        self.course=None
+        self.taping=False
+        if not self.headless:
+            self.font=pg.font.SysFont(S.FONT_NAME,22)
+            self.bigfont=pg.font.SysFont(S.FONT_NAME,48)
         self.reset()
 
     def reset(self):
-        self.level=Level()
+        self.level=Level(self.rng)
+        if self.course is not None: self.level.stream(self.course)
+        if self.taping: self.level.tape=[]
+        if self.ghosts:
+            self.ghosts.level=self.level
+            self.ghosts.reset()
+            self.ghost_tick=0
         self.player=Player(320,S.HEIGHT-180)
+        self.prev=None
         self.lives=3
         self.score=0
+        self.hit_log=[]
         self.game_over=False
         self.time_scale=1.0
         self.flash_timer=0
         self.shake_timer=0
-        self.bg=self.make_bg()
-        self.particles=[]
+        self.bg=None
+        self.particles.clear()
         self.theme_index=0
         self.themes=[
             {'name':'Desert','bg_top':(60,48,28),'bg_bottom':(20,16,10),'parallax':[(40,32,20),(90,70,40),(140,110,70)]},
@@ -33,31 +70,56 @@ class Game:
         self.apply_theme(0,initial=True)
         self.milestone_shown=False
         self.milestone_timer=0
-        self.font=self.choose_font(S.UI_FONTS,22)
-        self.bigfont=self.choose_font(S.DISPLAY_FONTS,48)
-        self.bannerfont=self.choose_font(S.DISPLAY_FONTS,72)
-        self.gwfont=self.choose_font(['arialblack','poppins','bahnschrift','segoeui','verdana','arial'],84)
+        if not self.headless:
+            self.font=self.choose_font(S.UI_FONTS,22)
+            self.bigfont=self.choose_font(S.DISPLAY_FONTS,48)
+            self.bannerfont=self.choose_font(S.DISPLAY_FONTS,72)
+            self.gwfont=self.choose_font(['arialblack','poppins','bahnschrift','segoeui','verdana','arial'],84)
+            self.warm_banners()
         self.turbo_banner_timer=0
         self.shield_banner_timer=0
+        if S.GC_FREEZE and not self.headless: self.settle()
+
+    def step(self,actions=0,dt=S.SIM_DT):
+        if actions&C.RESTART and self.game_over:
+            self.reset()
+        r=self.player.rect
+        self.prev=(self.level.scroll_x,r.x,r.y)
+        if actions&C.FLIP and not self.game_over:
+            self.flip()
+        left=bool(actions&C.LEFT); right=bool(actions&C.RIGHT)
+        if actions&C.DASH:
+            dir=-1 if left and not right else (1 if right else (1 if self.player.vx>=0 else -1))
+            self.player.dash(dir)
+        self.update(dt,left,right)
 
-    def update(self,dt,keys):
+    def run(self,ticks,policy=None,dt=S.SIM_DT):
+        for _ in range(ticks):
+            self.step(policy(self) if policy else 0,dt)
+            if self.game_over: break
+        return self
+
+    def update(self,dt,left=False,right=False):
         if self.game_over: return
         ts= self.player.slowmo and S.SLOW_MO_SCALE or 1.0
         dt*=ts
-        self.player.input(dt,keys)
+        self.player.input(dt,left,right)
+        prof.lap('input')
         self.level.update(dt)
-        for t in getattr(self.level,'turrets',[]):
-            if t.can_fire():
-                b=t.fire()
-                if not hasattr(self.level,'bullets'): self.level.bullets=[]
-                self.level.bullets.append(b)
-        for d in getattr(self.level,'drones',[]):
-            d.update(dt,self.player)
-        for c in getattr(self.level,'crates',[]):
-            c.update(dt)
+        self.level.fire_turrets()
+        self.level.drones.update(dt,self.player)
+        self.level.crates.update(dt)
+        if self.ghosts:
+            t=self.ghost_tick
+            self.ghost_tick+=1
+            self.ghosts.step(self.ghost_actions[t] if t<len(self.ghost_actions) else 0,dt)
+        prof.lap('movers')
         self.handle_collisions(dt)
+        prof.lap('collisions')
         self.player.apply_physics(dt)
+        prof.lap('physics')
         self.update_particles(dt)
+        prof.lap('particles')
         self.score+=S.SCROLL_SPEED*dt*0.1
         new_index=int(self.score//1000)%len(self.themes)
         if new_index!=self.theme_index:
@@ -66,13 +128,14 @@ class Game:
             self.milestone_shown=True
             self.milestone_timer=4.0
         if self.player.rect.top> S.HEIGHT+80 or self.player.rect.bottom< -80:
-            self.hit()
+            self.hit('fall')
+        prof.lap('rules')
 
     def handle_collisions(self,dt):
         self.player.on_surface=False
         self.player.surface_friction=S.GROUND_FRICTION
         self.player.grav_scale=1.0
-        for p in self.level.platforms:
+        for p in self.level.platforms.near(self.player.rect,S.COLLIDE_MARGIN):
             if self.player.rect.colliderect(p.rect):
                 if self.player.grav_dir>0:
                     self.player.rect.bottom=p.rect.top
@@ -84,12 +147,12 @@ class Game:
                 self.player.surface_friction= S.ICE_FRICTION if p.ice else S.GROUND_FRICTION
                 if getattr(p,'conveyor_vx',0)!=0:
                     self.player.vx+=p.conveyor_vx*dt
-        for s in getattr(self.level,'springs',[]):
+        for s in self.level.springs.near(self.player.rect):
             if self.player.rect.colliderect(s.rect):
                 sp=abs(self.player.vy)
                 self.player.vy= -self.player.grav_dir* max(380, sp*S.SPRING_COEF)
                 self.spawn_particles(self.player.rect.centerx,self.player.rect.bottom if self.player.grav_dir>0 else self.player.rect.top,(255,220,120),count=20,speed=240)
-        for fp in getattr(self.level,'falls',[]):
+        for fp in self.level.falls.near(self.player.rect,S.COLLIDE_MARGIN):
             if self.player.rect.colliderect(fp.rect):
                 if self.player.grav_dir>0:
                     self.player.rect.bottom=fp.rect.top
@@ -99,7 +162,7 @@ class Game:
                     self.player.vy=0
                 self.player.on_surface=True
                 fp.triggered=True
-        for sl in getattr(self.level,'slopes',[]):
+        for sl in self.level.slopes.near(self.player.rect,S.COLLIDE_MARGIN):
             if self.player.rect.colliderect(sl.rect):
                 x=self.player.rect.centerx
                 ys=sl.y_at(x)
@@ -113,52 +176,45 @@ class Game:
                         self.player.rect.top=ys
                         self.player.vy=0
                         self.player.on_surface=True
-        for s in self.level.spikes:
+        for s in self.level.spikes.near(self.player.rect):
             if self.player.rect.colliderect(s.rect):
-                self.hazard()
-        for b in self.level.bombs:
+                self.hazard('spike')
+        for b in self.level.bombs.near(self.player.rect):
             if self.player.rect.colliderect(b.rect):
-                self.hazard()
-        for pend in self.level.pendulums:
+                self.hazard('bomb')
+        for pend in self.level.pendulums.near(self.player.rect):
             if self.player.rect.colliderect(pend.rect):
-                self.hazard()
-        for saw in self.level.saws:
+                self.hazard('pendulum')
+        for saw in self.level.saws.near(self.player.rect):
             if self.player.rect.colliderect(saw.rect):
-                self.hazard()
-        for l in self.level.lasers:
+                self.hazard('saw')
+        for l in self.level.lasers.near(self.player.rect):
             if l.active and self.player.rect.colliderect(l.rect):
-                self.hazard()
-        for ps in getattr(self.level,'popspikes',[]):
+                self.hazard('laser')
+        for ps in self.level.popspikes.near(self.player.rect):
             if ps.active and self.player.rect.colliderect(ps.rect):
-                self.hazard()
-        for b in getattr(self.level,'bullets',[]):
+                self.hazard('popspike')
+        for b in self.level.bullets.near(self.player.rect):
             if self.player.rect.colliderect(b.rect):
                 b.alive=False
-                self.hazard()
-        for d in getattr(self.level,'drones',[]):
+                self.hazard('bullet')
+        for d in self.level.drones.near(self.player.rect):
             if self.player.rect.colliderect(d.rect):
-                self.hazard()
-        for c in getattr(self.level,'crushers',[]):
+                self.hazard('drone')
+        for c in self.level.crushers.near(self.player.rect):
             if self.player.rect.colliderect(c.rect):
-                self.hazard()
-        for w in getattr(self.level,'winds',[]):
-            if self.player.rect.colliderect(w.rect):
-                self.player.vx+=w.wind_vx*dt
-        in_grav=False
-        for g in getattr(self.level,'gravzones',[]):
-            if self.player.rect.colliderect(g.rect):
-                self.player.grav_scale=g.scale
-                in_grav=True
-        if not in_grav:
-            self.player.grav_scale=1.0
-        for wl in getattr(self.level,'walls',[]):
+                self.hazard('crusher')
+        wind,grav,_,_=self.level.field.sample(self.player.rect)
+        if wind: self.player.vx+=wind*dt
+        self.player.grav_scale=grav
+        for wl in self.level.walls.near(self.player.rect,S.COLLIDE_MARGIN):
             if self.player.rect.colliderect(wl.rect):
                 if self.player.vx>0:
                     self.player.rect.right=wl.rect.left
                 elif self.player.vx<0:
                     self.player.rect.left=wl.rect.right
                 self.player.vx=0
-        for cr in getattr(self.level,'crates',[]):
+        for cr in self.level.crates.near(self.player.rect,S.COLLIDE_MARGIN):
             if self.player.rect.colliderect(cr.rect):
                 if self.player.vx>0:
                     self.player.rect.right=cr.rect.left
@@ -175,20 +231,14 @@ class Game:
                     self.player.rect.top=cr.rect.bottom
                     self.player.vy=0
                     self.player.on_surface=True
-        for well in getattr(self.level,'wells',[]):
-            dx=well.x-self.player.rect.centerx
-            dy=well.y-self.player.rect.centery
-            dist=max(1,(dx*dx+dy*dy)**0.5)
-            if dist<well.r:
-                ax= well.sign* S.WELL_STRENGTH* dx/(dist*dist)
-                ay= well.sign* S.WELL_STRENGTH* dy/(dist*dist)
-                self.player.vx+=ax*dt
-                self.player.vy+=ay*dt
-        for lq in getattr(self.level,'liquids',[]):
-            if self.player.rect.colliderect(lq.rect):
-                self.player.grav_scale=S.LIQUID_GRAV_SCALE
-                self.player.vx-= self.player.vx* S.LIQUID_DRAG
-        for pu in self.level.powerups:
+        for ax,ay in self.level.field.pull(self.player.rect):
+            self.player.vx+=ax*dt
+            self.player.vy+=ay*dt
+        liquid=self.level.field.sample(self.player.rect)[2]
+        if liquid:
+            self.player.grav_scale=S.LIQUID_GRAV_SCALE
+            for _ in range(liquid): self.player.vx-= self.player.vx* S.LIQUID_DRAG
+        for pu in self.level.powerups.near(self.player.rect):
             if pu.alive and self.player.rect.colliderect(pu.rect):
                 pu.alive=False
                 self.score+=100
@@ -202,16 +252,18 @@ class Game:
                     self.player.grant_turbo()
                     self.turbo_banner_timer=2.5
 
-    def hazard(self):
+    def hazard(self,cause=None):
         if self.player.shield_charges>0:
             self.player.shield_charges-=1
+            self.hit_log.append((cause,True))
             self.flash_timer=0.4
             self.shake_timer=S.SHAKE_TIME
             self.spawn_particles(self.player.rect.centerx,self.player.rect.centery,(255,80,80),count=20,speed=280)
             return
-        self.hit()
+        self.hit(cause)
 
-    def hit(self):
+    def hit(self,cause=None):
+        self.hit_log.append((cause,False))
         self.lives-=1
         self.flash_timer=0.6
         self.shake_timer=S.SHAKE_TIME
@@ -229,72 +281,165 @@ class Game:
             self.spawn_particles(self.player.rect.centerx,self.player.rect.centery,(255,230,120),count=30,speed=220)
         return ok
 
-    def draw(self):
+    def snapshot(self,into=None):
+        if into is None:
+            snap=copy.copy(self)
+            level=player=particles=ghosts=None
+        else:
+            snap=into
+            level,player,particles,ghosts=snap.level,snap.player,snap.particles,snap.ghosts
+            vars(snap).update(vars(self))
+        snap.level=self.level.snapshot(level)
+        snap.player=self.player.snapshot(player)
+        snap.particles=self.particles.snapshot(particles)
+        if self.ghosts: snap.ghosts=self.ghosts.snapshot(ghosts if ghosts is not self.ghosts else None)
+        return snap
+
+    def fade(self,dt):
+        for nm in ('shake_timer','milestone_timer','flash_timer','turbo_banner_timer','shield_banner_timer'):
+            v=getattr(self,nm)
+            if v>0: setattr(self,nm,v-dt)
+
+    def draw(self,alpha=1.0,dt=1/S.FPS):
+        self.fade(dt)
+        if alpha>=1.0 or self.prev is None: return self.render()
+        L=self.level; r=self.player.rect
+        scroll=L.scroll_x; pos=r.topleft
+        sx,px,py=self.prev
+        self.view_at(sx+(scroll-sx)*alpha)
+        r.topleft=(round(px+(r.x-px)*alpha),round(py+(r.y-py)*alpha))
+        try:
+            return self.render()
+        finally:
+            self.view_at(scroll)
+            r.topleft=pos
+
+    def view_at(self,x):
+        L=self.level
+        L.scroll_x=x
+        for tab in L.layers: tab.cam=x
+
+    def render(self):
         offx=offy=0
+        cv=self.canvas
         if self.shake_timer>0:
-            self.shake_timer-=1/ S.FPS
-            offx=random.randint(-S.SHAKE_AMPL,S.SHAKE_AMPL)
-            offy=random.randint(-S.SHAKE_AMPL,S.SHAKE_AMPL)
-        self.screen.blit(self.bg,(0,0))
-        self.draw_parallax(offx)
-        self.level.draw(self.screen)
+            offx=self.fx_rng.randint(-S.SHAKE_AMPL,S.SHAKE_AMPL)
+            offy=self.fx_rng.randint(-S.SHAKE_AMPL,S.SHAKE_AMPL)
+        screen=self.screen
+        view=screen.get_rect()
+        band=self.compose_backdrop(offx)
+        full=not self.dirty or band==view
+        lines=self.hud_lines()
+        keep=[False]*len(lines)
+        if full:
+            screen.blit(cv.backdrop,(0,0))
+        else:
+            for r in cv.drawn: screen.blit(cv.backdrop,r,r)
+            if band: screen.blit(cv.backdrop,band,band)
+            for i,((text,_,_),(last,r)) in enumerate(zip(lines,cv.hud)):
+                if r is None: continue
+                keep[i]=text==last and r.collidelist(cv.drawn)<0 and not (band and r.colliderect(band))
+                if not keep[i]: screen.blit(cv.backdrop,r,r)
+        prof.lap('draw.backdrop')
+        rects=self.level.draw(screen)
+        if self.ghosts: rects+=self.ghosts.draw(screen)
+        prof.lap('draw.level')
         if self.milestone_timer>0:
-            self.milestone_timer-=1/ S.FPS
             a=max(0,int(140*self.milestone_timer/4.0))
-            text=self.bannerfont.render("KWATRO LANG MA'AM",True,(255,220,140))
-            s=pg.Surface((text.get_width()+40,text.get_height()+20),pg.SRCALPHA)
-            s.fill((0,0,0,a))
-            self.screen.blit(s,(S.WIDTH//2 - s.get_width()//2,S.HEIGHT//2 - s.get_height()//2))
-            r=text.get_rect(center=(S.WIDTH//2,S.HEIGHT//2))
-            self.draw_text("KWATRO LANG MA'AM",self.bannerfont,(S.WIDTH//2,S.HEIGHT//2),(255,220,140),center=True)
-        for p in self.particles: p.draw(self.screen)
-        self.player.draw(self.screen)
-        hud=f"Score {int(self.score)}   Lives {self.lives}   Grav {'Down' if self.player.grav_dir>0 else 'Up'}"
-        self.draw_text(hud,self.font,(16,12),S.COLOR_TEXT)
-        pu=[]
-        if self.player.shield_charges>0: pu.append('Shield')
-        if self.player.slowmo: pu.append('SlowMo')
-        if self.player.bounce_timer>0: pu.append('Bounce')
-        if self.player.doubleflip_timer>0: pu.append('DoubleFlip')
-        im2=self.font.render("PowerUps: "+(", ".join(pu) if pu else "None"),True,S.COLOR_TEXT)
-        self.screen.blit(im2,(16,40))
+            text=T.cache.get(self.bannerfont,"KWATRO LANG MA'AM",(255,220,140))[0]
+            s=SP.cache.get(SP.flat,text.get_width()+40,text.get_height()+20,(0,0,0))
+            s.set_alpha(a)
+            rects.append(screen.blit(s,(S.WIDTH//2 - s.get_width()//2,S.HEIGHT//2 - s.get_height()//2)))
+            rects.append(self.draw_text("KWATRO LANG MA'AM",self.bannerfont,(S.WIDTH//2,S.HEIGHT//2),(255,220,140),center=True))
+            prof.lap('draw.fx')
+        rects+=self.particles.draw(screen)
+        prof.lap('draw.particles')
+        rects.append(self.player.draw(screen))
+        prof.lap('draw.player')
+        hud=[]
+        for i,(text,pos,style) in enumerate(lines):
+            last,r=cv.hud[i]
+            if keep[i]:
+                if r.collidelist(rects)<0: continue
+                self.repaint(r)
+            nr=T.cache.blit(screen,self.font,text,S.COLOR_TEXT,pos,style=style)
+            cv.hud[i]=(text,nr)
+            hud.append(nr.union(r) if r else nr)
+        prof.lap('draw.hud')
         if self.flash_timer>0:
-            self.flash_timer-=1/ S.FPS
-            overlay=pg.Surface((S.WIDTH,S.HEIGHT),pg.SRCALPHA)
-            a=int(140*max(self.flash_timer,0))
-            overlay.fill((255,80,80,a))
-            self.screen.blit(overlay,(0,0))
+            overlay=SP.cache.get(SP.flat,S.WIDTH,S.HEIGHT,(255,80,80))
+            overlay.set_alpha(int(140*max(self.flash_timer,0)))
+            rects.append(screen.blit(overlay,(0,0)))
         if self.game_over:
-            self.draw_text("Game Over",self.bigfont,(S.WIDTH//2,S.HEIGHT//2-30),(255,200,200),center=True)
-            self.draw_text("Press R to restart",self.font,(S.WIDTH//2,S.HEIGHT//2+20),S.COLOR_TEXT,center=True)
+            rects.append(self.draw_text("Game Over",self.bigfont,(S.WIDTH//2,S.HEIGHT//2-30),(255,200,200),center=True))
+            rects.append(self.draw_text("Press R to restart",self.font,(S.WIDTH//2,S.HEIGHT//2+20),S.COLOR_TEXT,center=True))
         if self.turbo_banner_timer>0:
-            self.turbo_banner_timer-=1/ S.FPS
             a=max(0,int(160*self.turbo_banner_timer/2.5))
-            self.draw_gw_text("CABEROY",(S.WIDTH//2,S.HEIGHT//3),a)
+            rects.append(self.draw_gw_text("CABEROY",(S.WIDTH//2,S.HEIGHT//3),a))
         if self.shield_banner_timer>0:
-            self.shield_banner_timer-=1/ S.FPS
             a=max(0,int(160*self.shield_banner_timer/2.5))
-            self.draw_gw_text("CABEROY",(S.WIDTH//2, S.HEIGHT*2//3),a)
+            rects.append(self.draw_gw_text("CABEROY",(S.WIDTH//2, S.HEIGHT*2//3),a))
+        rects+=prof.draw(screen)
+        prof.lap('draw.fx')
+        old=cv.drawn
+        cv.drawn=rects
+        if not self.dirty: return None
+        if full: return [view]
+        old+=rects
+        old+=hud
+        if band: old.append(band)
+        return old
+
+    def hud_lines(self):
+        p=self.player
+        pu=[]
+        if p.shield_charges>0: pu.append('Shield')
+        if p.slowmo: pu.append('SlowMo')
+        if p.bounce_timer>0: pu.append('Bounce')
+        if p.doubleflip_timer>0: pu.append('DoubleFlip')
+        return ((f"Score {int(self.score)}   Lives {self.lives}   Grav {'Down' if p.grav_dir>0 else 'Up'}",(16,12),'outlined'),
+            ("PowerUps: "+(", ".join(pu) if pu else "None"),(16,40),'plain'))
+
+    def repaint(self,r):
+        screen=self.screen
+        screen.blit(self.canvas.backdrop,r,r)
+        screen.set_clip(r)
+        self.level.draw(screen,r)
+        if self.ghosts: self.ghosts.draw(screen)
+        self.particles.draw(screen)
+        self.player.draw(screen)
+        screen.set_clip(None)
 
     def make_bg(self):
-        surf=pg.Surface((S.WIDTH,S.HEIGHT))
         top=getattr(self,'bg_top',S.BG_TOP); bot=getattr(self,'bg_bottom',S.BG_BOTTOM)
-        for y in range(S.HEIGHT):
-            t=y/S.HEIGHT
-            c=(int(top[0]*(1-t)+bot[0]*t),int(top[1]*(1-t)+bot[1]*t),int(top[2]*(1-t)+bot[2]*t))
-            pg.draw.line(surf,c,(0,y),(S.WIDTH,y))
-        return surf
+        return SP.cache.get(SP.gradient,S.WIDTH,S.HEIGHT,tuple(top),tuple(bot))
 
-    def draw_parallax(self,offx=0):
+    def draw_parallax(self,surf,offx=0):
         x=self.level.scroll_x
-        cols=getattr(self,'parallax_colors',S.PARALLAX_COLORS)
-        for i,col in enumerate(cols):
-            sp=S.PARALLAX_SPEEDS[i]
-            base=int((x*sp)/300)%S.WIDTH
-            ybase= S.HEIGHT- (140-i*50)
-            for k in range(-1,3):
-                px= k*S.WIDTH - base + offx
-                pg.draw.polygon(self.screen,col,[(px,ybase),(px+220,ybase-40),(px+440,ybase),(px+660,ybase-50),(px+880,ybase)])
+        out=[]
+        for i,strip in enumerate(self.parallax_strips):
+            base=int((x*S.PARALLAX_SPEEDS[i])/300)%S.WIDTH
+            px=(offx-base)%S.WIDTH-S.WIDTH
+            y=S.HEIGHT-(140-i*50)-50
+            out.append(surf.blit(strip,(px,y)))
+            out.append(surf.blit(strip,(px+S.WIDTH,y)))
+        return out[0].unionall(out[1:])
+
+    def compose_backdrop(self,offx=0):
+        x=self.level.scroll_x
+        key=(offx,)+tuple(int((x*sp)/300)%S.WIDTH for sp in S.PARALLAX_SPEEDS)
+        cv=self.canvas
+        if cv.bg is not self.bg:
+            cv.backdrop=self.bg.copy()
+            cv.bg=self.bg
+            cv.key=key
+            cv.band=self.draw_parallax(cv.backdrop,offx)
+            return cv.backdrop.get_rect()
+        if key==cv.key: return None
+        cv.key=key
+        cv.backdrop.blit(self.bg,cv.band,cv.band)
+        cv.band=self.draw_parallax(cv.backdrop,offx)
+        return cv.band
 
     def apply_theme(self,index,initial=False):
         self.theme_index=index
@@ -303,7 +448,9 @@ class Game:
         self.bg_bottom=th['bg_bottom']
         self.parallax_colors=th['parallax']
         self.level.set_theme(th['name'])
-        self.bg=self.make_bg()
+        if not self.headless:
+            self.bg=self.make_bg()
+            self.parallax_strips=[SP.cache.get(SP.parallax_strip,col) for col in self.parallax_colors]
         if not initial:
             self.flash_timer=0.5
             self.shake_timer=0.4
@@ -314,70 +461,58 @@ class Game:
         for nm in names:
             key=nm.replace(" ","").lower()
             if key in available:
-                return pg.font.SysFont(key,size)
-        return pg.font.SysFont(S.FONT_NAME,size)
+                return T.cache.font(key,size)
+        return T.cache.font(S.FONT_NAME,size)
 
     def draw_text(self,text,font,pos,color,center=False):
-        im=font.render(text,True,color)
-        r=im.get_rect()
-        if center:
-            r.center=pos
-        else:
-            r.topleft=pos
-        shadow=pg.Surface((r.width+6,r.height+6),pg.SRCALPHA)
-        shadow.fill(S.COLOR_TEXT_SHADOW)
-        self.screen.blit(shadow,(r.x+3,r.y+3))
-        outline_col=S.COLOR_TEXT_OUTLINE
-        o=1
-        base=font.render(text,True,outline_col)
-        self.screen.blit(base,(r.x-o,r.y))
-        self.screen.blit(base,(r.x+o,r.y))
-        self.screen.blit(base,(r.x,r.y-o))
-        self.screen.blit(base,(r.x,r.y+o))
-        self.screen.blit(im,r)
+        return T.cache.blit(self.screen,font,text,color,pos,center,'outlined')
 
     def draw_gw_text(self,text,center,alpha_val):
         t=self.level.t
         font=self.gwfont
-        letters=list(text)
-        mats=[]
-        for ch in letters:
-            surf=font.render(ch,True,(255,120,190))
-            mats.append(surf)
+        sizes=[]
         total=0
-        scales=[]
-        for i,sf in enumerate(mats):
+        wide=0
+        tall=0
+        for i,ch in enumerate(text):
+            w0,h0=T.cache.get(font,ch,S.COLOR_BANNER)[0].get_size()
             sc=1.0+0.06*math.sin(t*6+i*0.5)
-            scales.append(sc)
-            total+=int(sf.get_width()*sc)
+            sizes.append((int(w0*sc),int(h0*sc)))
+            total+=sizes[-1][0]
+            wide+=int(w0*1.06)
+            tall=max(tall,h0)
         x0=center[0]-total//2
         y0=center[1]
-        bg=pg.Surface((total+40,max(m.get_height() for m in mats)+30),pg.SRCALPHA)
-        bg.fill((0,0,0,alpha_val))
-        self.screen.blit(bg,(center[0]-bg.get_width()//2,center[1]-bg.get_height()//2))
+        bg=SP.cache.get(SP.flat,wide+40,tall+30,(0,0,0))
+        bg.set_alpha(alpha_val)
+        rects=[self.screen.blit(bg,(center[0]-bg.get_width()//2,center[1]-bg.get_height()//2))]
         x=x0
-        for i,sf in enumerate(mats):
-            sc=scales[i]
-            h=int(sf.get_height()*sc)
-            w=int(sf.get_width()*sc)
-            imp=pg.transform.smoothscale(sf,(w,h))
+        for i,ch in enumerate(text):
+            w,h=sizes[i]
+            imp,glow,out=SP.cache.get(SP.banner_letter,font,ch,w,h,S.COLOR_BANNER)
             yo=int(6*math.sin(t*5+i*0.6))
             r=imp.get_rect()
             r.center=(x+w//2,y0+yo)
-            glow=pg.transform.smoothscale(imp,(int(w*1.2),int(h*1.2)))
-            glow.set_alpha(120)
             gr=glow.get_rect(center=r.center)
-            self.screen.blit(glow,gr.topleft)
-            base_outline=font.render(letters[i],True,S.COLOR_TEXT_OUTLINE)
-            out=pg.transform.smoothscale(base_outline,(w,h))
+            rects.append(self.screen.blit(glow,gr.topleft))
             orc=out.get_rect(center=r.center)
-            self.screen.blit(out,(orc.x-2,orc.y))
-            self.screen.blit(out,(orc.x+2,orc.y))
-            self.screen.blit(out,(orc.x,orc.y-2))
-            self.screen.blit(out,(orc.x,orc.y+2))
-            self.screen.blit(imp,r.topleft)
+            rects.append(self.screen.blit(out,(orc.x-2,orc.y)))
+            rects.append(self.screen.blit(out,(orc.x+2,orc.y)))
+            rects.append(self.screen.blit(out,(orc.x,orc.y-2)))
+            rects.append(self.screen.blit(out,(orc.x,orc.y+2)))
+            rects.append(self.screen.blit(imp,r.topleft))
             x+=w
-        return pg.Rect(x0,y0-20,total,40)
+        return rects[0].unionall(rects[1:])
+
+    def warm_banners(self,text="CABEROY"):
+        font=self.gwfont
+        for ch in set(text):
+            w0,h0=T.cache.get(font,ch,S.COLOR_BANNER)[0].get_size()
+            for k in range(241):
+                sc=0.94+k*0.0005
+                SP.cache.get(SP.banner_letter,font,ch,int(w0*sc),int(h0*sc),S.COLOR_BANNER)
+        T.cache.get(self.bannerfont,"KWATRO LANG MA'AM",(255,220,140),'outlined')
+        SP.cache.get(SP.flat,S.WIDTH,S.HEIGHT,(255,80,80))
 
     def draw_tulip(self,x,y,scale=1.0):
         s=max(0.6,scale)
@@ -394,17 +529,34 @@ class Game:
         pg.draw.circle(self.screen,(255,160,190),(x-petal_r//2,y-petal_r//3),petal_r-2)
         pg.draw.circle(self.screen,(255,90,140),(x+petal_r//2,y-petal_r//3),petal_r-3)
 
+    def lock_theme(self,name):
+        self.themes=[th for th in self.themes if th['name']==name]
+        self.apply_theme(0,initial=True)
+
+    def settle(self):
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+
+    def play_course(self,course):
+        self.course=course
+        self.reset()
+
+    def add_ghosts(self,recordings):
+        a=np.zeros((max(len(r) for r in recordings),len(recordings)),np.uint8)
+        for k,r in enumerate(recordings): a[:len(r),k]=np.frombuffer(r.actions,np.uint8)
+        self.ghost_actions=a
+        self.ghost_tick=0
+        self.ghosts=Agents(len(recordings),self.level,advance=False)
+
+    def counts(self):
+        out=self.level.counts()
+        out['particles']=len(self.particles)
+        return out
+
     def spawn_particles(self,x,y,color,count=20,speed=200):
-        import random
-        for _ in range(count):
-            ang=random.uniform(0,3.14159*2)
-            vx=math.cos(ang)*speed
-            vy=math.sin(ang)*speed
-            self.particles.append(Particle(x,y,color,life=random.uniform(0.3,0.7),vx=vx,vy=vy,rad=random.randint(2,4)))
-        if len(self.particles)>S.PARTICLE_LIMIT:
-            self.particles=self.particles[-S.PARTICLE_LIMIT:]
+        self.particles.spawn(x,y,color,count,speed)
 
     def update_particles(self,dt):
-        for p in self.particles: p.update(dt)
-        self.particles=[p for p in self.particles if p.life>0]
+        self.particles.update(dt)
 from .entities import Bullet, Turret, Drone, Crusher, PopSpike, FallingPlatform
@@ -1,34 +1,99 @@
 import sys
+import argparse
 import pygame as pg
 from . import settings as S
+from . import controls as C
 from .game import Game
+from .replay import Recording, Replay
+from .profiler import prof
+from . import course as CS
+from .pipeline import Pipeline
 
-def main():
+def main(argv=None):
+    ap=argparse.ArgumentParser(prog="gravity-flip-runner")
+    ap.add_argument("--seed",type=int)
+    ap.add_argument("--record",metavar="PATH")
+    ap.add_argument("--replay",metavar="PATH")
+    ap.add_argument("--frame",type=int,default=0,help="fast-forward a replay to this tick before rendering")
+    ap.add_argument("--dirty",action="store_true",help="redraw and push only the screen regions that changed")
+    ap.add_argument("--ghost",metavar="PATH",action="append",default=[],help="race against a recorded run (repeatable)")
+    ap.add_argument("--profile",metavar="CSV",help="time every frame phase and write the samples to CSV on exit (F3 toggles the overlay)")
+    ap.add_argument("--fps",type=int,default=S.FPS,help="render frame cap (0 = uncapped); simulation always steps at 1/SIM_DT")
+    ap.add_argument("--course",metavar="PATH",help="play a course file instead of generating one")
+    ap.add_argument("--save-course",metavar="PATH",help="write the course of the current run to PATH on exit")
+    ap.add_argument("--threaded",action="store_true",help="step the simulation on a worker thread and render published snapshots")
+    args=ap.parse_args(argv)
+    if args.threaded and args.replay: ap.error("--threaded cannot drive a replay")
     pg.init()
     pg.display.set_caption("Gravity Flip Runner")
     screen=pg.display.set_mode((S.WIDTH,S.HEIGHT))
     pg.key.set_repeat()
     pg.event.set_grab(True)
-    game=Game(screen)
+    replay=None
+    if args.replay:
+        try: replay=Replay(Recording.load(args.replay),screen,CS.Course(args.course) if args.course else None)
+        except ValueError as e: ap.error(str(e))
+        game=replay.seek(args.frame)
+    else:
+        ghosts=[Recording.load(p) for p in args.ghost]
+        seed=args.seed if args.seed is not None or not ghosts else ghosts[0].seed
+        game=Game(screen,seed=seed)
+        if ghosts: game.add_ghosts(ghosts)
+        if args.course: game.play_course(CS.Course(args.course))
+    game.dirty=args.dirty
+    if args.save_course:
+        game.taping=True
+        game.level.tape=[]
+    rec=Recording(game.seed,course=game.course.digest if game.course is not None else b'') if args.record and not replay else None
+    if args.profile: prof.enable(keep=True)
+    pipe=Pipeline(game,rec).start() if args.threaded else None
     running=True
+    acc=0.0
+    edges=0
+    game.clock.tick()
     while running:
-        dt=game.clock.tick(S.FPS)/1000.0
+        frame=game.clock.tick(args.fps)/1000.0
+        acc+=min(frame,S.MAX_FRAME_TIME)
+        prof.start()
         keys=pg.key.get_pressed()
-        for e in pg.event.get():
+        events=pg.event.get()
+        for e in events:
             if e.type==pg.QUIT:
                 running=False
-            if e.type==pg.KEYUP:
-                if e.key==pg.K_SPACE and not game.game_over:
-                    game.flip()
-                if e.key==pg.K_r and game.game_over:
-                    game.reset()
-            if e.type==pg.KEYDOWN:
-                if e.key==pg.K_LSHIFT or e.key==pg.K_RSHIFT:
-                    dir=-1 if keys[pg.K_a] and not keys[pg.K_d] else (1 if keys[pg.K_d] else (1 if game.player.vx>=0 else -1))
-                    game.player.dash(dir)
-        game.update(dt,keys)
-        game.draw()
-        pg.display.flip()
+            if e.type==pg.KEYDOWN and e.key==pg.K_F3:
+                prof.toggle()
+        prof.lap('events')
+        if replay:
+            while acc>=S.SIM_DT and running:
+                acc-=S.SIM_DT
+                if not replay.step(): running=False
+        elif pipe:
+            pipe.feed(C.read(keys,events))
+        else:
+            a=C.read(keys,events)
+            edges|=a&C.EDGES
+            while acc>=S.SIM_DT:
+                acc-=S.SIM_DT
+                act=(a&C.HELD)|edges
+                edges=0
+                if rec is not None: rec.record(act,S.SIM_DT)
+                game.step(act,S.SIM_DT)
+        if pipe:
+            view,alpha=pipe.latest()
+            rects=view.draw(alpha,0.0)
+        else:
+            rects=game.draw(acc/S.SIM_DT,frame)
+        if rects is None: pg.display.flip()
+        else: pg.display.update(rects)
+        prof.lap('present')
+        prof.end(view if pipe else game)
+    if pipe: pipe.stop()
+    if rec is not None:
+        rec.save(args.record)
+    if args.save_course:
+        CS.save(args.save_course,game.level.tape,game.seed)
+    if args.profile:
+        prof.save(args.profile)
     pg.quit()
     return 0
 
@@ -0,0 +1,87 @@
+import copy
+import math
+import numpy as np
+import pygame as pg
+from . import settings as S
+
+class Particles:
+    def __init__(self,cap=S.PARTICLE_LIMIT,rng=None):
+        self.cap=cap
+        self.rng=rng if rng is not None else np.random.default_rng()
+        self.x=np.zeros(cap)
+        self.y=np.zeros(cap)
+        self.vx=np.zeros(cap)
+        self.vy=np.zeros(cap)
+        self.life=np.zeros(cap)
+        self.rad=np.zeros(cap,np.int16)
+        self.color=np.zeros(cap,np.int16)
+        self.palette=[]
+        self.palette_index={}
+        self.sprites={}
+        self.head=0
+        self.ttl=0.0
+
+    def clear(self):
+        self.life[:]=0
+        self.head=0
+        self.ttl=0.0
+
+    def spawn(self,x,y,color,count=20,speed=200):
+        count=min(count,self.cap)
+        c=self.palette_index.get(color)
+        if c is None:
+            c=self.palette_index[color]=len(self.palette)
+            self.palette.append(color)
+        rng=self.rng
+        i=(self.head+np.arange(count))%self.cap
+        ang=rng.uniform(0,math.pi*2,count)
+        life=rng.uniform(0.3,0.7,count)
+        self.x[i]=x; self.y[i]=y
+        self.vx[i]=np.cos(ang)*speed
+        self.vy[i]=np.sin(ang)*speed
+        self.life[i]=life
+        self.rad[i]=rng.integers(2,5,count)
+        self.color[i]=c
+        self.head=(self.head+count)%self.cap
+        self.ttl=max(self.ttl,float(life.max()))
+
+    def update(self,dt):
+        if self.ttl<=0: return
+        self.ttl-=dt
+        self.life-=dt
+        self.x+=self.vx*dt
+        self.y+=self.vy*dt
+        self.vy+=200*dt
+
+    def __len__(self):
+        return int(np.count_nonzero(self.life>0)) if self.ttl>0 else 0
+
+    def sprite(self,c,r):
+        im=self.sprites.get((c,r))
+        if im is None:
+            im=pg.Surface((r*2,r*2),pg.SRCALPHA)
+            pg.draw.circle(im,self.palette[c][:3],(r,r),r)
+            self.sprites[(c,r)]=im
+        return im
+
+    def snapshot(self,into=None):
+        if into is None or into.cap!=self.cap:
+            snap=copy.copy(self)
+            for nm in ('x','y','life','rad','color'): setattr(snap,nm,getattr(self,nm).copy())
+            return snap
+        keep=into.x,into.y,into.life,into.rad,into.color
+        vars(into).update(vars(self))
+        for nm,arr in zip(('x','y','life','rad','color'),keep):
+            np.copyto(arr,getattr(self,nm))
+            setattr(into,nm,arr)
+        return into
+
+    def draw(self,screen):
+        if self.ttl<=0: return []
+        i=(self.life>0).nonzero()[0]
+        if not len(i): return []
+        r=self.rad[i]
+        xs=(self.x[i].astype(np.int32)-r).tolist()
+        ys=(self.y[i].astype(np.int32)-r).tolist()
+        sprite=self.sprite
+        return screen.blits((sprite(c,rr),(px,py)) for c,rr,px,py in zip(self.color[i].tolist(),r.tolist(),xs,ys))
@@ -0,0 +1,86 @@
+import time
+import threading
+from . import settings as S
+from . import controls as C
+from .profiler import prof
+
+class Pipeline:
+    def __init__(self,game,rec=None):
+        self.game=game
+        self.rec=rec
+        self.lock=threading.Lock()
+        self.held=0
+        self.edges=0
+        self.back=None
+        self.ready=None
+        self.front=None
+        self.fresh=False
+        self.base=0.0
+        self.ticks=0
+        self.running=False
+        self.error=None
+        self.thread=threading.Thread(target=self.loop,name="sim",daemon=True)
+
+    def start(self):
+        self.publish(time.perf_counter())
+        self.running=True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running=False
+        if self.thread.is_alive(): self.thread.join()
+
+    def feed(self,actions):
+        with self.lock:
+            self.held=actions&C.HELD
+            self.edges|=actions&C.EDGES
+
+    def publish(self,base):
+        back=self.game.snapshot(self.back)
+        with self.lock:
+            self.back=self.ready
+            self.ready=back
+            self.base=base
+            self.fresh=True
+
+    def latest(self):
+        with self.lock:
+            if self.fresh:
+                self.front,self.ready=self.ready,self.front
+                self.fresh=False
+            snap=self.front; base=self.base
+        if self.error is not None: raise self.error
+        return snap,min(1.0,(time.perf_counter()-base)/S.SIM_DT)
+
+    def loop(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error=e
+            self.running=False
+
+    def run(self):
+        game=self.game; rec=self.rec
+        t=time.perf_counter()
+        acc=0.0
+        while self.running:
+            now=time.perf_counter()
+            acc+=min(now-t,S.MAX_FRAME_TIME)
+            t=now
+            if acc<S.SIM_DT:
+                time.sleep(S.SIM_DT-acc)
+                continue
+            prof.start()
+            while acc>=S.SIM_DT:
+                acc-=S.SIM_DT
+                with self.lock:
+                    act=self.held|self.edges
+                    self.edges=0
+                if rec is not None: rec.record(act,S.SIM_DT)
+                game.step(act,S.SIM_DT)
+                game.fade(S.SIM_DT)
+                self.ticks+=1
+            self.publish(t-acc)
+            prof.lap('snapshot')
+            prof.hand_off()
@@ -0,0 +1,195 @@
+from collections import deque
+from functools import lru_cache
+from . import settings as S
+from .entities import Platform, Spike, Pendulum, Bomb, PowerUp, Saw, LaserGate, Slope, WindZone, GravityZone, Wall, Turret, Drone, Crusher, PopSpike, FallingPlatform, Crate, Springboard, GravityWell, LiquidZone
+
+H=S.HEIGHT
+
+class Param:
+    __slots__=('draw',)
+    def __init__(self,draw):
+        self.draw=draw
+
+def choice(*seq):
+    return Param(lambda rng:rng.choice(seq))
+
+def uniform(a,b):
+    return Param(lambda rng:rng.uniform(a,b))
+
+def randint(a,b):
+    return Param(lambda rng:rng.randint(a,b))
+
+KINDS={'platforms':Platform,'spikes':Spike,'pendulums':Pendulum,'bombs':Bomb,'powerups':PowerUp,'saws':Saw,'lasers':LaserGate,
+    'slopes':Slope,'winds':WindZone,'gravzones':GravityZone,'walls':Wall,'turrets':Turret,'drones':Drone,'crushers':Crusher,
+    'popspikes':PopSpike,'falls':FallingPlatform,'crates':Crate,'springs':Springboard,'wells':GravityWell,'liquids':LiquidZone}
+
+class Capture:
+    @staticmethod
+    def push(x,y,w,h,**vals):
+        return (x,y,w,h),vals
+
+CAPTURE=Capture()
+
+class Put:
+    __slots__=('table','kind','args','kw','xs','dargs','dkw')
+    def __init__(self,table,*args,xs=(0,),**kw):
+        self.table=table
+        self.kind=KINDS[table]
+        self.args=args
+        self.kw=kw
+        self.xs=xs
+        self.dargs=[(i,a) for i,a in enumerate(args) if isinstance(a,Param)]
+        self.dkw=[(k,v) for k,v in kw.items() if isinstance(v,Param)]
+    def emit(self,rng,x,d,out):
+        args=list(self.args)
+        for i,p in self.dargs: args[i]=p.draw(rng)
+        for i in self.xs: args[i]+=x
+        kw=self.kw
+        if self.dkw:
+            kw=dict(kw)
+            for k,p in self.dkw: kw[k]=p.draw(rng)
+        out.append((self.table,)+self.kind.add(CAPTURE,*args,**kw))
+
+class Chance:
+    __slots__=('p','dp','steps')
+    def __init__(self,p,dp,*steps):
+        self.p=p
+        self.dp=dp
+        self.steps=steps
+    def emit(self,rng,x,d,out):
+        if rng.random()<self.p+d*self.dp:
+            for s in self.steps: s.emit(rng,x,d,out)
+
+class Repeat:
+    __slots__=('lo','hi','steps')
+    def __init__(self,lo,hi,*steps):
+        self.lo=lo
+        self.hi=hi
+        self.steps=steps
+    def emit(self,rng,x,d,out):
+        for _ in range(rng.randint(self.lo,self.hi)):
+            for s in self.steps: s.emit(rng,x,d,out)
+
+PATTERNS={
+    'flat':(Put('platforms',0,H-60,160,28),Put('platforms',0,30,160,28),
+        Chance(0.25,0.2,Put('pendulums',80,30,rad=16,spd=uniform(0.8,1.2)))),
+    'gap':(Put('platforms',0,H-60,120,28),Chance(0.5,0.0,Put('platforms',180,30,140,28))),
+    'stairs':(Put('platforms',0,H-60,120,28),Put('platforms',140,H-100,120,28,move={'axis':'y','amp':30,'spd':1.2})),
+    'ice':(Put('platforms',0,H-60,200,26,ice=True),Put('platforms',0,30,200,26,ice=True)),
+    'bounce':(Put('platforms',0,H-70,160,20,bounce=True),),
+    'conveyor':(Put('platforms',0,H-60,200,26,conveyor_vx=choice(-120,120)),),
+    'saw':(Put('saws',100,H-120,rad=18,spd=220),),
+    'laser':(Put('lasers',140,80,h=H-160,period=2.0),),
+    'bomb_rain':(Repeat(2,4,Put('bombs',randint(20,140),randint(-160,-40))),),
+    'pend_gate':(Put('pendulums',80,30,rad=18,spd=1.0),Put('pendulums',160,30,rad=18,spd=1.2)),
+    'slope':(Put('slopes',0,H-60,200,choice(H-120,H-140,H-160),xs=(0,2),thickness=12),),
+    'wind':(Put('winds',40,120,200,H-240,wind_vx=choice(160,-160)),),
+    'grav':(Put('gravzones',60,140,160,H-280,scale=choice(0.6,0.8,1.2,1.4)),),
+    'walls':(Put('walls',140,160,H-320,width=22),),
+    'turret':(Put('turrets',160,H//2),),
+    'drone':(Put('drones',200,choice(120,H-120)),),
+    'crusher':(Put('crushers',160,top=choice(True,False)),),
+    'popspike':(Put('popspikes',80,H-56,up=True),Put('popspikes',80,30,up=False)),
+    'falling':(Put('falls',120,H-100,120,24),),
+    'crate':(Put('crates',120,H-140),),
+    'spring':(Put('springs',120,H-78),),
+    'well':(Put('wells',180,H//2,r=120,sign=choice(1,-1)),),
+    'liquid':(Put('liquids',40,160,200,H-320),),
+}
+
+EXTRAS=(
+    Chance(0.20,0.15,Put('bombs',randint(40,120),-40)),
+    Chance(0.18,0.0,Put('powerups',randint(20,120),choice(H-120,80),choice('shield','slow','bounce','dflip','turbo'))),
+)
+
+PREFABS={name:steps+EXTRAS for name,steps in PATTERNS.items()}
+
+THEMES={
+    'Desert':{
+        'flat':10,'gap':8,'stairs':7,'ice':3,'bounce':6,'conveyor':5,
+        'saw':5,'laser':4,'bomb_rain':6,'pend_gate':5,'slope':10,'wind':7,'grav':4,'walls':4,
+        'turret':4,'drone':4,'crusher':4,'popspike':7,'falling':7,'crate':9,'spring':9,'well':4,'liquid':3
+    },
+    'Factory':{
+        'flat':7,'gap':8,'stairs':6,'ice':2,'bounce':3,'conveyor':10,
+        'saw':8,'laser':10,'bomb_rain':7,'pend_gate':6,'slope':4,'wind':3,'grav':6,'walls':8,
+        'turret':10,'drone':7,'crusher':8,'popspike':7,'falling':5,'crate':6,'spring':4,'well':3,'liquid':2
+    },
+    'Ocean':{
+        'flat':8,'gap':7,'stairs':6,'ice':1,'bounce':4,'conveyor':3,
+        'saw':4,'laser':5,'bomb_rain':7,'pend_gate':7,'slope':7,'wind':10,'grav':8,'walls':4,
+        'turret':4,'drone':5,'crusher':4,'popspike':6,'falling':6,'crate':5,'spring':6,'well':8,'liquid':10
+    },
+}
+
+class Alias:
+    def __init__(self,weights):
+        names=[k for k,w in weights.items() if w>0]
+        if not names: raise ValueError("pattern weights are all zero")
+        n=len(names)
+        total=sum(weights[k] for k in names)
+        scaled=[weights[k]*n/total for k in names]
+        prob=[1.0]*n
+        alias=list(range(n))
+        small=[i for i,v in enumerate(scaled) if v<1.0]
+        large=[i for i,v in enumerate(scaled) if v>=1.0]
+        while small and large:
+            s=small.pop(); l=large[-1]
+            prob[s]=scaled[s]; alias[s]=l
+            scaled[l]-=1.0-scaled[s]
+            if scaled[l]<1.0: small.append(large.pop())
+        self.names=names
+        self.n=n
+        self.cells=[(p,names[i],names[a]) for p,i,a in zip(prob,range(n),alias)]
+
+    def draw(self,rng):
+        u=rng.random()*self.n
+        i=int(u)
+        p,a,b=self.cells[i]
+        return a if u-i<p else b
+
+@lru_cache(maxsize=32)
+def _alias(items):
+    return Alias(dict(items))
+
+def sampler(weights):
+    return _alias(tuple(weights.items()))
+
+TABLES={nm:sampler(w) for nm,w in THEMES.items()}
+
+class Generator:
+    def __init__(self,rng):
+        self.rng=rng
+        self.table=None
+        self.queue=deque()
+        self.x=0
+
+    def reset(self,x):
+        self.queue.clear()
+        self.x=x
+
+    def retheme(self,table):
+        if table is self.table: return
+        self.table=table
+        if self.queue: self.reset(self.queue[0][0])
+
+    def plan(self,difficulty):
+        rng=self.rng
+        x=self.x
+        pat=self.table.draw(rng)
+        batch=[]
+        for step in PREFABS[pat]: step.emit(rng,x,difficulty,batch)
+        self.x=x+rng.randint(160,260)
+        self.queue.append((x,pat,batch,self.x))
+
+    def take(self,difficulty):
+        if not self.queue: self.plan(difficulty(self.x))
+        return self.queue.popleft()
+
+    def fill(self,limit,difficulty,budget):
+        while budget>0 and self.x<limit:
+            self.plan(difficulty(self.x))
+            budget-=1
+
+    def __len__(self):
+        return len(self.queue)
@@ -0,0 +1,159 @@
+import gc
+import sys
+import csv
+import time
+import threading
+from collections import deque
+import numpy as np
+from . import settings as S
+from . import text as T
+
+class Lane(threading.local):
+    def __init__(self):
+        self.t=time.perf_counter()
+        self.frame={}
+
+class Profiler:
+    def __init__(self,window=S.PROFILE_WINDOW):
+        self.window=window
+        self.on=False
+        self.show=False
+        self.keep=False
+        self.lane=Lane()
+        self.lock=threading.Lock()
+        self.handed={}
+        self.hist={}
+        self.rows=deque(maxlen=window)
+        self.lines=[]
+        self.frames=0
+        self.gc_t=0.0
+        self.gc_ms=0.0
+        self.gc_gen=-1
+        self.last_gc=-1
+        self.blocks=0
+        self.hooked=False
+
+    def enable(self,show=False,keep=False):
+        self.on=True
+        self.show=self.show or show
+        if keep and not self.keep:
+            self.keep=True
+            self.rows=list(self.rows)
+        self.lane.t=time.perf_counter()
+        self.blocks=sys.getallocatedblocks()
+        if not self.hooked:
+            gc.callbacks.append(self.on_gc)
+            self.hooked=True
+
+    def on_gc(self,phase,info):
+        if not self.on: return
+        if phase=='start':
+            self.gc_t=time.perf_counter()
+            return
+        self.gc_ms+=(time.perf_counter()-self.gc_t)*1000
+        self.gc_gen=max(self.gc_gen,info['generation'])
+
+    def disable(self):
+        self.on=self.show=self.keep=False
+
+    def toggle(self):
+        if not self.show: self.enable(True)
+        elif self.keep: self.show=False
+        else: self.disable()
+
+    def start(self):
+        if not self.on: return
+        ln=self.lane
+        ln.frame={}
+        ln.t=time.perf_counter()
+
+    def lap(self,name):
+        if not self.on: return
+        ln=self.lane
+        t=time.perf_counter()
+        f=ln.frame
+        f[name]=f.get(name,0.0)+(t-ln.t)*1000
+        ln.t=t
+
+    def hand_off(self):
+        if not self.on: return
+        f=self.lane.frame
+        self.lane.frame={}
+        with self.lock:
+            h=self.handed
+            for nm,v in f.items(): h['sim.'+nm]=h.get('sim.'+nm,0.0)+v
+
+    def end(self,game):
+        if not self.on: return
+        f=self.lane.frame
+        f['total']=sum(f.values())
+        with self.lock:
+            side=self.handed
+            self.handed={}
+        if side:
+            side['sim.total']=sum(side.values())
+            f.update(side)
+        f['gc']=self.gc_ms
+        for nm,v in f.items():
+            h=self.hist.get(nm)
+            if h is None: h=self.hist[nm]=deque(maxlen=self.window)
+            h.append(v)
+        row=dict(f)
+        row.update(('n.'+k,v) for k,v in game.counts().items())
+        row['frame']=self.frames
+        b=sys.getallocatedblocks()
+        row['alloc']=b-self.blocks
+        row['gc.gen']=self.gc_gen
+        self.blocks=b
+        if self.gc_gen>=0: self.last_gc=self.gc_gen
+        self.gc_ms=0.0
+        self.gc_gen=-1
+        self.rows.append(row)
+        self.frames+=1
+        if self.show and self.frames%S.PROFILE_REFRESH==0: self.lines=self.report()
+        self.lane.frame={}
+
+    def stats(self,name):
+        return np.percentile(np.fromiter(self.hist[name],float),(50,95,99))
+
+    def report(self):
+        out=["%-16s %6s %6s %6s"%("phase ms","p50","p95","p99")]
+        for nm in sorted(self.hist,key=lambda k:(k=='total',k)):
+            out.append("%-16s %6.2f %6.2f %6.2f"%((nm,)+tuple(self.stats(nm))))
+        row=self.rows[-1]
+        counts=["%s:%d"%(k[2:],v) for k,v in row.items() if k.startswith('n.') and v]
+        for i in range(0,len(counts),6):
+            out.append(" ".join(counts[i:i+6]))
+        out.append("alloc %+d blocks  last gc gen %d"%(row['alloc'],self.last_gc))
+        return out
+
+    def draw(self,screen):
+        if not self.show: return []
+        font=T.cache.font(S.PROFILE_FONT,14)
+        y=70
+        rects=[]
+        for line in self.lines:
+            rects.append(T.cache.blit(screen,font,line,S.COLOR_TEXT,(16,y),style='outlined'))
+            y+=16
+        return rects
+
+    def save(self,path):
+        cols=['frame']
+        for row in self.rows:
+            for k in row:
+                if k not in cols: cols.append(k)
+        with open(path,'w',newline='') as f:
+            w=csv.DictWriter(f,cols,restval=0)
+            w.writeheader()
+            w.writerows(self.rows)
+
+    def clear(self):
+        self.lane.frame={}
+        self.handed={}
+        self.hist.clear()
+        self.rows=[] if self.keep else deque(maxlen=self.window)
+        self.lines=[]
+        self.frames=0
+        self.last_gc=-1
+
+prof=Profiler()
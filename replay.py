@@ -0,0 +1,82 @@
+import struct
+import sys
+import zlib
+from array import array
+from . import settings as S
+from .game import Game
+
+MAGIC=b'GFRR'
+VERSION=2
+HEADER=struct.Struct('<4sHQI20s')
+LEGACY=struct.Struct('<4sHQI')
+
+class Recording:
+    def __init__(self,seed,actions=None,dts=None,course=b''):
+        self.seed=seed
+        self.course=course
+        self.actions=actions if actions is not None else bytearray()
+        self.dts=dts if dts is not None else array('d')
+
+    def __len__(self):
+        return len(self.actions)
+
+    def record(self,actions,dt=S.SIM_DT):
+        self.actions.append(actions)
+        self.dts.append(dt)
+
+    def save(self,path):
+        dts=array('d',self.dts)
+        if sys.byteorder=='big': dts.byteswap()
+        body=zlib.compress(bytes(self.actions)+dts.tobytes(),9)
+        with open(path,'wb') as f:
+            f.write(HEADER.pack(MAGIC,VERSION,self.seed,len(self.actions),self.course))
+            f.write(body)
+
+    @classmethod
+    def load(cls,path):
+        with open(path,'rb') as f: data=f.read()
+        magic,version,seed,n=LEGACY.unpack_from(data)
+        if magic!=MAGIC: raise ValueError(f"{path}: not a recording")
+        if version==1:
+            course=b''; off=LEGACY.size
+        elif version==VERSION:
+            course=HEADER.unpack_from(data)[4]; off=HEADER.size
+            if not any(course): course=b''
+        else: raise ValueError(f"{path}: unsupported recording version {version}")
+        body=zlib.decompress(data[off:])
+        dts=array('d')
+        dts.frombytes(body[n:n+n*8])
+        if sys.byteorder=='big': dts.byteswap()
+        return cls(seed,bytearray(body[:n]),dts,course)
+
+class Replay:
+    def __init__(self,recording,screen=None,course=None):
+        got=course.digest if course is not None else b''
+        if got!=recording.course:
+            if not recording.course: raise ValueError("this recording was made on a generated level, not a course")
+            raise ValueError("this recording was made on a different course" if course is not None else "this recording was made on a course; pass the same course file")
+        self.rec=recording
+        self.screen=screen
+        self.course=course
+        self.restart()
+
+    def restart(self):
+        self.game=Game(self.screen,seed=self.rec.seed)
+        if self.course is not None: self.game.play_course(self.course)
+        self.tick=0
+
+    @property
+    def done(self):
+        return self.tick>=len(self.rec)
+
+    def step(self):
+        if self.done: return False
+        self.game.step(self.rec.actions[self.tick],self.rec.dts[self.tick])
+        self.tick+=1
+        return True
+
+    def seek(self,tick):
+        if tick<self.tick: self.restart()
+        tick=min(tick,len(self.rec))
+        while self.tick<tick: self.step()
+        return self.game
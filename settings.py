@@ -1,7 +1,15 @@
 WIDTH=1280
 HEIGHT=720
 FPS=60
+SIM_DT=1.0/FPS
+MAX_FRAME_TIME=0.25
 SCROLL_SPEED=260
+SPAWN_AHEAD=900
+PREGEN_AHEAD=1200
+PREGEN_BUDGET=1
+PREGEN_WARM=64
+COURSE_BLOCK=64
+DIFFICULTY_RAMP=60.0
 PLAYER_SPEED=280
 PLAYER_ACC=1600
 PLAYER_MAX_VX=420
@@ -26,6 +34,7 @@ TURBO_SPEED_SCALE=1.6
 TURBO_ACC_SCALE=1.5
 TURBO_DURATION=4.0
 FONT_NAME="consolas"
+TEXT_CACHE_SIZE=256
 UI_FONTS=["poppins","segoeui","bahnschrift","verdana","trebuchetms","calibri","arial"]
 DISPLAY_FONTS=["poppins","bahnschrift","segoeui","verdana","arialblack","arial"]
 BG_TOP=(30,34,46)
@@ -33,9 +42,17 @@ BG_BOTTOM=(10,12,20)
 PARALLAX_COLORS=[(20,22,30),(35,40,60),(60,70,100)]
 PARALLAX_SPEEDS=[30,60,120]
 TRAIL_LENGTH=18
-PARTICLE_LIMIT=220
+SAW_SPIN=6.0
+SAW_FRAMES=8
+PARTICLE_LIMIT=4096
 SHAKE_AMPL=10
 SHAKE_TIME=0.4
+COLLIDE_MARGIN=64
+DRAW_MARGIN=160
+GC_FREEZE=True
+PROFILE_WINDOW=240
+PROFILE_REFRESH=15
+PROFILE_FONT="consolas,dejavusansmono,couriernew"
 COLOR_PLAYER=(255,235,90)
 COLOR_PLATFORM=(90,180,255)
 COLOR_ICE=(170,220,255)
@@ -46,6 +63,7 @@ COLOR_POWERUP=(120,255,150)
 COLOR_TEXT=(240,245,255)
 COLOR_TEXT_OUTLINE=(20,22,30)
 COLOR_TEXT_SHADOW=(0,0,0,160)
+COLOR_BANNER=(255,120,190)
 COLOR_SLOPE=(120,200,255)
 COLOR_WIND=(180,220,255)
 COLOR_GRAV_ZONE=(200,160,255)
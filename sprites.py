@@ -0,0 +1,124 @@
+import math
+import threading
+import numpy as np
+import pygame as pg
+from . import settings as S
+from . import text as T
+
+class SpriteCache:
+    def __init__(self):
+        self.sprites={}
+        self.lock=threading.RLock()
+
+    def get(self,build,*args):
+        key=(build,)+args
+        with self.lock:
+            im=self.sprites.get(key)
+            if im is None:
+                im=self.sprites[key]=build(*args)
+            return im
+
+    def clear(self):
+        with self.lock:
+            self.sprites.clear()
+
+def spike_strip(w,h,up,color):
+    im=pg.Surface((w+1,h+1),pg.SRCALPHA)
+    sw=w//10
+    for i in range(10):
+        bx=i*sw
+        if up:
+            pts=[(bx,h),(bx+sw//2,0),(bx+sw,h)]
+        else:
+            pts=[(bx,0),(bx+sw//2,h),(bx+sw,0)]
+        pg.draw.polygon(im,color,pts)
+    return im
+
+def saw(rad,frame):
+    im=pg.Surface((rad*2+1,rad*2+1),pg.SRCALPHA)
+    c=(rad,rad)
+    pg.draw.circle(im,(230,230,230),c,rad)
+    spin=frame*(math.pi/4)/S.SAW_FRAMES
+    for i in range(8):
+        ang=i*math.pi/4+spin
+        x=rad+int(math.cos(ang)*rad)
+        y=rad+int(math.sin(ang)*rad)
+        pg.draw.line(im,(180,180,180),c,(x,y),2)
+    return im
+
+def well(r,color):
+    im=pg.Surface((r*2+1,r*2+1),pg.SRCALPHA)
+    c=(r,r)
+    pg.draw.circle(im,color,c,r,2)
+    pg.draw.circle(im,color,c,int(r*0.6),1)
+    pg.draw.circle(im,color,c,int(r*0.3),1)
+    return im
+
+def rounded(w,h,color,radius):
+    im=pg.Surface((w,h),pg.SRCALPHA)
+    pg.draw.rect(im,color,(0,0,w,h),border_radius=radius)
+    return im
+
+def powerup(w,h,label):
+    im=rounded(w,h,S.COLOR_POWERUP,6)
+    T.cache.blit(im,T.cache.font(S.FONT_NAME,16),label,(30,40,40),(w//2,h//2),center=True)
+    return im
+
+def flat(w,h,color):
+    im=pg.Surface((w,h))
+    im.fill(color)
+    return im
+
+def banner_letter(font,ch,w,h,color):
+    imp=pg.transform.smoothscale(font.render(ch,True,color),(w,h))
+    glow=pg.transform.smoothscale(imp,(int(w*1.2),int(h*1.2)))
+    glow.set_alpha(120)
+    out=pg.transform.smoothscale(font.render(ch,True,S.COLOR_TEXT_OUTLINE),(w,h))
+    return imp,glow,out
+
+def gradient(w,h,top,bottom):
+    t=(np.arange(h)/h)[:,None]
+    c=(np.array(top)*(1-t)+np.array(bottom)*t).astype(np.uint8)
+    im=pg.Surface((1,h))
+    pg.surfarray.blit_array(im,c[None])
+    return pg.transform.scale(im,(w,h))
+
+def parallax_strip(color):
+    key=(255,0,255) if color!=(255,0,255) else (0,255,0)
+    im=pg.Surface((S.WIDTH,51))
+    im.fill(key)
+    im.set_colorkey(key,pg.RLEACCEL)
+    pg.draw.polygon(im,color,[(0,50),(220,10),(440,50),(660,0),(880,50)])
+    return im
+
+def trail_discs(n,turbo):
+    out=[]
+    for i in range(n):
+        a=int(180*(i/n))
+        r=4+int(6*(i/n))
+        im=pg.Surface((r*2,r*2),pg.SRCALPHA)
+        tc=(255,220,120,a) if not turbo else (255,140,40,a)
+        pg.draw.circle(im,tc,(r,r),r)
+        out.append(im)
+    return out
+
+def shadow(w,h):
+    im=pg.Surface((w,h),pg.SRCALPHA)
+    pg.draw.ellipse(im,(0,0,0,60),(0,0,w,h))
+    return im
+
+def player(w,h,color,shield):
+    im=pg.Surface((w+10,h+10),pg.SRCALPHA)
+    r=pg.Rect(5,5,w,h)
+    pg.draw.rect(im,(20,20,20),r.inflate(6,6),border_radius=9)
+    pg.draw.rect(im,color,r,border_radius=8)
+    if shield:
+        pg.draw.rect(im,(120,220,255),r.inflate(10,10),2,border_radius=10)
+    return im
+
+def ghost(w,h,color):
+    im=player(w,h,color,False).copy()
+    im.set_alpha(110)
+    return im
+
+cache=SpriteCache()
@@ -0,0 +1,205 @@
+import math
+from bisect import bisect_left
+import numpy as np
+import pygame as pg
+
+class col:
+    def __init__(self,dtype=np.float64,default=0):
+        self.dtype=dtype
+        self.default=default
+    def __set_name__(self,owner,name):
+        self.name=name
+    def __get__(self,obj,owner=None):
+        if obj is None: return self
+        return getattr(obj.tab,self.name)[obj.i]
+    def __set__(self,obj,v):
+        getattr(obj.tab,self.name)[obj.i]=v
+
+class Row:
+    __slots__=('tab','i')
+    DRIFT=False
+    alive=col(bool,True)
+    def __init__(self,tab,i):
+        self.tab=tab
+        self.i=i
+    @property
+    def rect(self):
+        t=self.tab; i=self.i
+        return pg.Rect(math.floor(t.x[i]-t.cam),math.floor(t.y[i]),int(t.w[i]),int(t.h[i]))
+    @classmethod
+    def columns(cls):
+        out={}
+        for k in reversed(cls.__mro__):
+            for nm,v in vars(k).items():
+                if isinstance(v,col): out[nm]=v
+        return out
+    @staticmethod
+    def update_all(tab,dt):
+        pass
+
+class Table:
+    SCALAR=8
+    def __init__(self,kind,cap=32):
+        self.kind=kind
+        self.specs={'x':col(),'y':col(),'w':col(),'h':col(),'key':col(),'reach':col()}
+        self.specs.update(kind.columns())
+        self.head=0
+        self.tail=0
+        self.cap=cap
+        self.cam=0.0
+        self.lo=0.0
+        self.hi=0.0
+        self.stale=False
+        self.buf={nm:np.full(cap,c.default,c.dtype) for nm,c in self.specs.items()}
+        self.cursor=kind(self,0)
+        self.refresh()
+
+    def refresh(self):
+        h=self.head; t=self.tail
+        for nm,a in self.buf.items():
+            setattr(self,nm,a[h:t])
+        self.n=t-h
+        self.rekey()
+
+    def rekey(self):
+        n=self.n
+        self.keys=self.key.tolist()
+        self.edge=math.inf if not n else -math.inf if self.kind.DRIFT else float(self.x[0]+self.w[0])
+
+    def compact(self):
+        live=self.alive.copy()
+        k=int(np.count_nonzero(live))
+        for a in self.buf.values():
+            a[:k]=a[self.head:self.tail][live]
+        self.head=0
+        self.tail=k
+        self.refresh()
+        self.reslack()
+
+    def grow(self):
+        self.cap*=2
+        for nm,a in self.buf.items():
+            b=np.full(self.cap,self.specs[nm].default,a.dtype)
+            b[:self.tail]=a[:self.tail]
+            self.buf[nm]=b
+        self.refresh()
+
+    def push(self,x,y,w,h,**vals):
+        if self.tail==self.cap:
+            self.compact()
+            if self.tail>self.cap//2: self.grow()
+        i=self.tail
+        for nm,a in self.buf.items():
+            a[i]=vals.get(nm,self.specs[nm].default)
+        b=self.buf
+        key=max(x,b['key'][i-1]) if i>self.head else x
+        b['x'][i]=x; b['y'][i]=y; b['w'][i]=w; b['h'][i]=h; b['key'][i]=key
+        key=float(key); reach=float(b['reach'][i])
+        self.lo=max(self.lo,key-x+reach)
+        self.hi=max(self.hi,x+w-key+reach)
+        self.tail+=1
+        self.refresh()
+        return i-self.head
+
+    def reslack(self):
+        self.stale=False
+        if not self.n:
+            self.lo=self.hi=0.0
+            return
+        d=self.key-self.x
+        self.lo=float((d+self.reach).max())
+        self.hi=float((self.w-d+self.reach).max())
+
+    def add(self,*args,**kw):
+        return self.kind.add(self,*args,**kw)
+
+    def clear(self):
+        self.head=self.tail=0
+        self.refresh()
+        self.reslack()
+
+    def update(self,dt,*args):
+        if not self.n: return
+        self.kind.update_all(self,dt,*args)
+        if self.kind.DRIFT: self.stale=True
+
+    def cull(self,limit):
+        if not self.n: return
+        if self.kind.DRIFT:
+            gone=self.x+self.w<limit
+            if gone.any(): self.alive[gone]=False
+        h=self.head; t=self.tail
+        b=self.buf
+        x=b['x']; w=b['w']; alive=b['alive']
+        while h<t and (not alive[h] or x[h]+w[h]<limit): h+=1
+        if h!=self.head:
+            self.head=h
+            self.refresh()
+            self.reslack()
+
+    def window(self,left,right):
+        if self.stale: self.reslack()
+        keys=self.keys
+        return bisect_left(keys,left-self.hi),bisect_left(keys,right+self.lo)
+
+    def hits(self,rect,margin=0):
+        if not self.n: return ()
+        cam=self.cam
+        left=rect.left+cam-margin; right=rect.right+cam+margin
+        a,b=self.window(left,right)
+        if a>=b: return ()
+        if b-a<=self.SCALAR:
+            top=rect.top-margin; bottom=rect.bottom+margin
+            return [i for i,x,y,w,h,live in zip(range(a,b),self.x[a:b].tolist(),self.y[a:b].tolist(),self.w[a:b].tolist(),self.h[a:b].tolist(),self.alive[a:b].tolist())
+                if live and x<right and x+w>left and y<bottom and y+h>top]
+        x=self.x[a:b]; y=self.y[a:b]
+        hit=(x<right)&(x+self.w[a:b]>left)&(y<rect.bottom+margin)&(y+self.h[a:b]>rect.top-margin)&self.alive[a:b]
+        return (hit.nonzero()[0]+a).tolist()
+
+    def near(self,rect,margin=0):
+        idx=self.hits(rect,margin)
+        if not idx: return ()
+        kind=self.kind
+        return [kind(self,i) for i in idx]
+
+    def scan(self,rect,margin=0):
+        view=self.cursor
+        for i in self.hits(rect,margin):
+            view.i=i
+            yield view
+
+    def snapshot(self,left,right,into=None):
+        a,b=self.window(left,right) if self.n else (0,0)
+        m=max(0,b-a)
+        snap=into
+        if snap is None:
+            snap=Table.__new__(Table)
+            snap.kind=self.kind
+            snap.specs=self.specs
+            snap.cap=0
+            snap.buf={nm:np.empty(0,arr.dtype) for nm,arr in self.buf.items()}
+            snap.n=-1
+            snap.cursor=self.kind(snap,0)
+        if m>snap.cap:
+            snap.cap=max(m,2*snap.cap)
+            snap.buf={nm:np.empty(snap.cap,arr.dtype) for nm,arr in self.buf.items()}
+            snap.n=-1
+        if m:
+            a+=self.head; b=a+m
+            for arr,out in zip(self.buf.values(),snap.buf.values()): out[:m]=arr[a:b]
+        snap.head=0
+        snap.tail=m
+        snap.cam=self.cam
+        snap.lo=self.lo
+        snap.hi=self.hi
+        snap.stale=False
+        if m!=snap.n: snap.refresh()
+        elif m: snap.rekey()
+        return snap
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        kind=self.kind
+        return (kind(self,i) for i in self.alive.nonzero()[0].tolist())
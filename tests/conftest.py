@@ -0,0 +1,5 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER","dummy")
+os.environ.setdefault("SDL_AUDIODRIVER","dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT","1")
@@ -0,0 +1,39 @@
+import random
+import numpy as np
+from ..game import Game
+from ..store import Table
+from .. import course as CS
+
+def state(g):
+    L=g.level
+    ents=tuple((nm,np.round(t.x,6).tolist(),t.y.tolist()) for nm,t in vars(L).items() if isinstance(t,Table))
+    return (round(g.score,6),g.lives,tuple(g.player.rect),L.spawn_x,ents)
+
+def test_taped_run_streams_back_identically(tmp_path):
+    acts=[random.Random(2).choice((0,2,2,4,8,1)) for _ in range(1500)]
+    taped=Game(seed=7); taped.taping=True; taped.level.tape=[]; taped.lives=10**9
+    want=[]
+    for a in acts:
+        taped.step(a); want.append(state(taped))
+    path=tmp_path/"run.course"
+    assert CS.save(path,taped.level.tape,7)>0
+    course=CS.Course(path)
+    assert course.seed==7
+    played=Game(seed=7); played.play_course(course); played.lives=10**9
+    for i,a in enumerate(acts):
+        played.step(a)
+        assert state(played)==want[i],i
+
+def test_generated_course_matches_info(tmp_path):
+    path=tmp_path/"gen.course"
+    n=CS.save(path,CS.generate(1,CS.S.WIDTH+CS.S.SPAWN_AHEAD+300*CS.S.SCROLL_SPEED),1)
+    course=CS.Course(path)
+    assert course.n==n
+    chunks=[]
+    while True:
+        c=course.take(0.0)
+        if c is None: break
+        chunks.append(c)
+    assert sum(len(c[2]) for c in chunks)==n
+    assert all(a[3]==b[0] for a,b in zip(chunks,chunks[1:]))
+    assert chunks[-1][3]==course.length
@@ -0,0 +1,43 @@
+import random
+import pytest
+from ..game import Game
+from ..replay import Recording, Replay
+from .. import course as CS
+from .. import settings as S
+
+def state(g):
+    L=g.level
+    return (round(g.score,6),g.lives,tuple(g.player.rect),round(g.player.vx,6),round(g.player.vy,6),len(L.platforms),len(L.bombs),L.spawn_x,g.game_over)
+
+def play(game,rec,n,seed):
+    rnd=random.Random(seed)
+    for _ in range(n):
+        a=rnd.choice((0,1,2,2,2,4,8,16)); dt=rnd.choice((1/60,1/59,1/61,1/30))
+        rec.record(a,dt); game.step(a,dt)
+
+def test_record_replay_is_deterministic(tmp_path):
+    game=Game(seed=42); rec=Recording(game.seed)
+    play(game,rec,1500,5)
+    path=tmp_path/"run.gfrr"
+    rec.save(path)
+    back=Recording.load(path)
+    assert back.seed==42 and len(back)==1500
+    assert list(back.actions)==list(rec.actions) and list(back.dts)==list(rec.dts)
+    rp=Replay(back)
+    assert state(rp.seek(1500))==state(game)
+    rp.seek(700)
+    assert state(rp.seek(1500))==state(game)
+
+def test_replay_checks_course(tmp_path):
+    path=tmp_path/"a.course"
+    CS.save(path,CS.generate(3,S.WIDTH+S.SPAWN_AHEAD+20*S.SCROLL_SPEED),3)
+    course=CS.Course(path)
+    game=Game(seed=9); game.play_course(course)
+    rec=Recording(game.seed,course=course.digest)
+    play(game,rec,600,1)
+    rec.save(tmp_path/"run.gfrr")
+    back=Recording.load(tmp_path/"run.gfrr")
+    assert back.course==course.digest
+    assert state(Replay(back,course=CS.Course(path)).seek(600))==state(game)
+    with pytest.raises(ValueError): Replay(back)
+    with pytest.raises(ValueError): Replay(Recording(9),course=course)
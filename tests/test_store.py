@@ -0,0 +1,113 @@
+import random
+import pygame as pg
+from ..store import Row, Table, col
+
+class Tagged(Row):
+    __slots__=()
+    tag=col()
+
+class Drifter(Row):
+    __slots__=()
+    DRIFT=True
+
+def brute(tab,rect,margin=0):
+    left=rect.left+tab.cam-margin; right=rect.right+tab.cam+margin
+    return [i for i in range(tab.n) if tab.alive[i] and tab.x[i]<right and tab.x[i]+tab.w[i]>left
+            and tab.y[i]<rect.bottom+margin and tab.y[i]+tab.h[i]>rect.top-margin]
+
+def filled(kind,rnd,n=200):
+    tab=Table(kind,cap=8)
+    x=0.0
+    for _ in range(n):
+        x+=rnd.uniform(-40,60)
+        tab.push(x,rnd.uniform(0,500),rnd.uniform(1,300),rnd.uniform(1,80),reach=rnd.choice((0,0,0,120)))
+    return tab
+
+def probes(rnd,n=300):
+    for _ in range(n):
+        yield pg.Rect(rnd.randint(-200,6000),rnd.randint(-50,550),rnd.randint(1,400),rnd.randint(1,200)),rnd.choice((0,0,8))
+
+def test_compact_skips_tombstones():
+    tab=Table(Tagged,cap=4)
+    for i in range(4): tab.push(i*10,i,5,5,tag=i)
+    tab.alive[1]=False
+    tab.push(40,4,5,5,tag=4)
+    assert tab.x.tolist()==[0,20,30,40]
+    assert tab.y.tolist()==[0,2,3,4]
+    assert tab.tag.tolist()==[0,2,3,4]
+    assert tab.alive.all()
+
+def test_window_matches_brute_force():
+    rnd=random.Random(1)
+    tab=filled(Row,rnd)
+    tab.cam=rnd.uniform(0,300)
+    for rect,margin in probes(rnd):
+        assert sorted(tab.hits(rect,margin))==brute(tab,rect,margin)
+
+def test_slack_bounds_cover_every_row():
+    rnd=random.Random(2)
+    tab=filled(Row,rnd)
+    d=tab.key-tab.x
+    assert tab.lo>=float((d+tab.reach).max())
+    assert tab.hi>=float((tab.w-d+tab.reach).max())
+    assert (tab.key[1:]>=tab.key[:-1]).all()
+    tab.reslack()
+    assert tab.lo==float((d+tab.reach).max())
+    assert tab.hi==float((tab.w-d+tab.reach).max())
+
+def test_drifting_rows_reslack_before_lookup():
+    rnd=random.Random(3)
+    tab=filled(Drifter,rnd)
+    tab.x[:]+=rnd.uniform(-500,500)
+    tab.w[::7]*=4
+    tab.update(1/60)
+    assert tab.stale
+    for rect,margin in probes(rnd):
+        assert sorted(tab.hits(rect,margin))==brute(tab,rect,margin)
+    assert not tab.stale
+
+def test_cull_drops_passed_and_dead_rows():
+    tab=Table(Tagged,cap=16)
+    for i in range(10): tab.push(i*100,0,50,10,tag=i)
+    tab.alive[3]=False
+    tab.cull(260)
+    assert tab.tag.tolist()==[4,5,6,7,8,9]
+    tab.alive[2]=False
+    tab.cull(460)
+    assert tab.tag.tolist()==[5,6,7,8,9]
+    assert [r.tag for r in tab]==[5,7,8,9]
+
+def test_cull_tombstones_drifted_rows():
+    tab=Table(Drifter,cap=16)
+    for i in range(6): tab.push(i*100,0,50,10)
+    tab.x[3]=-500
+    tab.cull(120)
+    assert tab.n==5
+    assert tab.alive.tolist()==[True,True,False,True,True]
+    assert sorted(tab.hits(pg.Rect(-1000,0,3000,10)))==[0,1,3,4]
+
+def test_push_compacts_before_growing():
+    tab=Table(Tagged,cap=8)
+    for i in range(8): tab.push(i*10,0,5,5,tag=i)
+    tab.cull(45)
+    tab.alive[:2]=False
+    tab.push(80,0,5,5,tag=8)
+    assert tab.cap==8
+    assert tab.tag.tolist()==[6,7,8]
+    for i in range(9,16): tab.push(i*10,0,5,5,tag=i)
+    assert tab.cap==16
+    assert tab.tag.tolist()==list(range(6,16))
+
+def test_snapshot_refills_in_place():
+    rnd=random.Random(4)
+    tab=filled(Tagged,rnd,60)
+    snap=tab.snapshot(-10**6,10**6)
+    buf=snap.buf
+    for left in (200,900,3000,-500,100):
+        got=tab.snapshot(left,left+800,snap)
+        want=tab.snapshot(left,left+800)
+        assert got is snap
+        assert all((got.buf[nm][:got.n]==want.buf[nm][:want.n]).all() for nm in want.buf) and got.n==want.n
+        assert got.keys==want.keys and got.edge==want.edge
+        assert sorted(got.hits(pg.Rect(left,0,800,600)))==brute(got,pg.Rect(left,0,800,600))
+        assert got.buf is buf
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+import pygame as pg
+from . import settings as S
+
+class TextCache:
+    def __init__(self,size=S.TEXT_CACHE_SIZE):
+        self.size=size
+        self.entries=OrderedDict()
+        self.fonts={}
+        self.hits=0
+        self.misses=0
+        self.lock=threading.RLock()
+
+    def font(self,name,size):
+        with self.lock:
+            f=self.fonts.get((name,size))
+            if f is None:
+                f=self.fonts[(name,size)]=pg.font.SysFont(name,size)
+            return f
+
+    def get(self,font,text,color,style='plain'):
+        key=(font,text,color,style)
+        with self.lock:
+            e=self.entries.get(key)
+            if e is not None:
+                self.entries.move_to_end(key)
+                self.hits+=1
+                return e
+            self.misses+=1
+            e=self.build(font,text,color,style)
+            self.entries[key]=e
+            if len(self.entries)>self.size:
+                self.entries.popitem(last=False)
+            return e
+
+    def build(self,font,text,color,style):
+        im=font.render(text,True,color)
+        w,h=im.get_size()
+        if style=='plain':
+            return im,0,0,w,h
+        o=1
+        surf=pg.Surface((w+o+9,h+o+9),pg.SRCALPHA)
+        surf.fill(S.COLOR_TEXT_SHADOW,(o+3,o+3,w+6,h+6))
+        base=font.render(text,True,S.COLOR_TEXT_OUTLINE)
+        for dx,dy in ((-o,0),(o,0),(0,-o),(0,o)):
+            surf.blit(base,(o+dx,o+dy))
+        surf.blit(im,(o,o))
+        return surf,o,o,w,h
+
+    def blit(self,screen,font,text,color,pos,center=False,style='plain'):
+        surf,ox,oy,w,h=self.get(font,text,color,style)
+        if center:
+            x=pos[0]-w//2; y=pos[1]-h//2
+        else:
+            x,y=pos
+        return screen.blit(surf,(x-ox,y-oy))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+cache=TextCache()